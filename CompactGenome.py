@@ -0,0 +1,92 @@
+"""
+A compact, array backed storage of a Genome.
+"""
+from array import array
+import struct
+
+# inputs, outputs, layers, next node, bias node, number of nodes, number of genes
+HEADER = struct.Struct("<HHiiiII")
+
+
+class CompactGenome:
+    """
+    A genome stored as columns of numbers instead of Node and Gene objects: one array per field of the nodes (number,
+    layer) and of the genes (starting node, ending node, weight, enabled, innovation number), with the genes in the
+    same order as in the genome.
+
+    This is meant for genomes that are kept around or sent to other processes rather than mutated: it takes a small
+    fraction of the memory of the genome and pickles into a few byte strings. to_bytes lays the columns out one after
+    the other (in the little endian byte order of the platforms the game runs on), so from_bytes only has to copy them
+    back.
+    """
+    __slots__ = ("inputs", "outputs", "layers", "next_node", "bias_node", "node_numbers", "node_layers",
+                 "starting_nodes", "ending_nodes", "weights", "enabled", "innovation_numbers")
+
+    inputs: int
+    outputs: int
+    layers: int
+    next_node: int
+    bias_node: int
+    node_numbers: array
+    node_layers: array
+    starting_nodes: array
+    ending_nodes: array
+    weights: array
+    enabled: bytearray
+    innovation_numbers: array
+
+    def __init__(self, genome: "Genome") -> None:
+        """
+        Initializes the compact storage of <genome>.
+        """
+        self.inputs, self.outputs = genome.inputs, genome.outputs
+        self.layers, self.next_node, self.bias_node = genome.layers, genome.next_node, genome.bias_node
+
+        self.node_numbers = array("i", [node.number for node in genome.nodes])
+        self.node_layers = array("i", [node.layer for node in genome.nodes])
+
+        genes = genome.genes
+        self.starting_nodes = array("i", [gene.starting_node.number for gene in genes])
+        self.ending_nodes = array("i", [gene.ending_node.number for gene in genes])
+        self.weights = array("d", [gene.weight for gene in genes])
+        self.enabled = bytearray(gene.enabled for gene in genes)
+        self.innovation_numbers = array("q", [gene.innovation_number for gene in genes])
+
+    def __len__(self) -> int:
+        """
+        Return the number of genes of this genome.
+        """
+        return len(self.weights)
+
+    def to_bytes(self) -> bytes:
+        """
+        Return this genome in its binary format.
+        """
+        header = HEADER.pack(self.inputs, self.outputs, self.layers, self.next_node, self.bias_node,
+                             len(self.node_numbers), len(self.weights))
+        return b"".join([header, self.node_numbers.tobytes(), self.node_layers.tobytes(),
+                         self.starting_nodes.tobytes(), self.ending_nodes.tobytes(), self.weights.tobytes(),
+                         self.innovation_numbers.tobytes(), bytes(self.enabled)])
+
+    @staticmethod
+    def from_bytes(data: bytes) -> "CompactGenome":
+        """
+        Return the genome stored in <data> by to_bytes. <data> can be any buffer, such as a slice of a memory map.
+        """
+        compact = CompactGenome.__new__(CompactGenome)
+        compact.inputs, compact.outputs, compact.layers, compact.next_node, compact.bias_node, node_count, \
+            gene_count = HEADER.unpack_from(data)
+
+        data = memoryview(data)
+        position = HEADER.size
+        for name, typecode, count in (("node_numbers", "i", node_count), ("node_layers", "i", node_count),
+                                      ("starting_nodes", "i", gene_count), ("ending_nodes", "i", gene_count),
+                                      ("weights", "d", gene_count), ("innovation_numbers", "q", gene_count)):
+            column = array(typecode)
+            end = position + column.itemsize * count
+            column.frombytes(data[position:end])
+            setattr(compact, name, column)
+            position = end
+
+        compact.enabled = bytearray(data[position:position + gene_count])
+        return compact
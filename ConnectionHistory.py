@@ -1,8 +1,7 @@
 """
 The connection history that stores history of all past connections
 """
-from typing import List
-from Genome import Genome
+from typing import Dict, FrozenSet, Tuple
 from Node import Node
 
 
@@ -13,15 +12,15 @@ class ConnectionHistory:
     starting_node: int
     ending_node: int
     innovation_number: int
-    innovation_numbers: List[int]
+    innovation_numbers: FrozenSet[int]
 
-    def __init__(self, start: int, end: int, num: int, nums: List[int]) -> None:
+    def __init__(self, start: int, end: int, num: int, nums: FrozenSet[int]) -> None:
         """
         Initializes a new connection history entry.
         """
         self.starting_node, self.ending_node, self.innovation_number, self.innovation_numbers = start, end, num, nums
 
-    def matches(self, genome: Genome, start: Node, end: Node) -> bool:
+    def matches(self, genome: "Genome", start: Node, end: Node) -> bool:
         """
         Returns whether or not the Genome <genome> matches the original genome that will call this function, and if
         the connection is the same between the nodes <start> and <end>.
@@ -34,3 +33,41 @@ class ConnectionHistory:
                 return True
 
         return False
+
+
+class InnovationHistory:
+    """
+    The history of every connection that has been made, indexed by the nodes it connects and the innovation numbers
+    of the genome it was made in, so that the same mutation always gets the same innovation number.
+    """
+    connections: Dict[Tuple[int, int, FrozenSet[int]], ConnectionHistory]
+    next_innovation_number: int
+
+    def __init__(self, next_innovation_number: int=1) -> None:
+        """
+        Initializes an empty history.
+        """
+        self.connections = {}
+        self.next_innovation_number = next_innovation_number
+
+    def __len__(self) -> int:
+        """
+        Return the number of distinct connections in this history.
+        """
+        return len(self.connections)
+
+    def innovation_number(self, genome: "Genome", start: Node, end: Node) -> int:
+        """
+        Return the innovation number of the connection between <start> and <end> in <genome>. If no such connection
+        has been made before, record it with a new and unique innovation number.
+        """
+        innovation_numbers = frozenset(gene.innovation_number for gene in genome.genes)
+        key = (start.number, end.number, innovation_numbers)
+
+        connection = self.connections.get(key)
+        if connection is None:
+            connection = ConnectionHistory(start.number, end.number, self.next_innovation_number, innovation_numbers)
+            self.connections[key] = connection
+            self.next_innovation_number += 1
+
+        return connection.innovation_number
@@ -0,0 +1,104 @@
+"""
+A compiled, array backed version of a Genome's neural network.
+"""
+from typing import List, Tuple, TYPE_CHECKING
+import numpy as np
+
+if TYPE_CHECKING:
+    from Genome import Genome
+
+
+class FeedForwardPlan:
+    """
+    The enabled connections of a genome grouped by the layer of the node they end in, so that the neural network can
+    be evaluated one layer at a time with NumPy instead of one node at a time.
+
+    The nodes are laid out by layer (the input nodes first, then the bias node), so each layer is a contiguous slice
+    of the node values. Each layer keeps the connections that end in it as arrays of their starting nodes, of their
+    ending nodes within the layer and of their weights, and the input sum of a node only adds up the connections that
+    really end in it, like Node.engage. (A dense weight matrix would also multiply the nodes that are not connected
+    by 0, and once a node overflows to infinity, infinity times 0 turns every later node into NaN.)
+    """
+    inputs: int
+    node_count: int
+    values: np.ndarray
+    output_positions: np.ndarray
+    layers: List[Tuple[int, int, np.ndarray, np.ndarray, np.ndarray]]
+
+    def __init__(self, genome: "Genome") -> None:
+        """
+        Compile the enabled genes of <genome> into a plan.
+        """
+        self.inputs = genome.inputs
+        self.node_count = len(genome.nodes)
+        self.values = np.empty(self.node_count)
+
+        # the input nodes and the bias node come first, then the rest of the nodes by layer
+        ordered = [genome.get_node(number) for number in range(genome.inputs)] + [genome.get_node(genome.bias_node)]
+        ordered += sorted([node for node in genome.nodes if node.layer != 0], key=lambda node: node.layer)
+        position = {node.number: index for index, node in enumerate(ordered)}
+        self.output_positions = np.array([position[genome.inputs + index] for index in range(genome.outputs)],
+                                         dtype=np.intp)
+
+        # the positions at which each layer starts and ends
+        bounds = {}
+        for index, node in enumerate(ordered):
+            start, _ = bounds.get(node.layer, (index, index))
+            bounds[node.layer] = (start, index + 1)
+
+        # only connections coming from an earlier layer contribute to the input sum of a node, and their weights are
+        # scaled by the slope of the activation in advance
+        connections = {layer: ([], [], []) for layer in bounds}
+        for gene in genome.genes:
+            layer = gene.ending_node.layer
+            if gene.enabled and gene.starting_node.layer < layer:
+                sources, targets, weights = connections[layer]
+                sources.append(position[gene.starting_node.number])
+                targets.append(position[gene.ending_node.number] - bounds[layer][0])
+                weights.append(-4.9 * gene.weight)
+
+        self.layers = []
+        for layer in sorted(bounds):
+            if layer != 0:
+                start, end = bounds[layer]
+                sources, targets, weights = connections[layer]
+                self.layers.append((start, end, np.array(sources, dtype=np.intp), np.array(targets, dtype=np.intp),
+                                    np.array(weights, dtype=float)))
+
+    def evaluate_one(self, input_values: List[float]) -> np.ndarray:
+        """
+        Return the outputs of the neural network for the single set of input values <input_values>.
+        """
+        values = self.values
+        values[:self.inputs] = input_values[:self.inputs]
+        values[self.inputs] = 1
+
+        # a node whose input sum is too large saturates to infinity, like Node.engage
+        with np.errstate(over="ignore"):
+            for start, end, sources, targets, weights in self.layers:
+                # the same activation as Node.engage
+                layer_values = np.bincount(targets, values[sources] * weights, end - start)
+                values[start:end] = np.exp(layer_values) + 1
+
+        return values[self.output_positions]
+
+    def evaluate(self, observations: np.ndarray) -> np.ndarray:
+        """
+        Return the outputs of the neural network for each row of <observations>, which has a shape of
+        (batch, inputs). The result has a shape of (batch, outputs).
+        """
+        observations = np.asarray(observations, dtype=float)
+        values = np.empty((observations.shape[0], self.node_count))
+        values[:, :self.inputs] = observations
+        values[:, self.inputs] = 1
+
+        batch = observations.shape[0]
+        with np.errstate(over="ignore"):
+            for start, end, sources, targets, weights in self.layers:
+                # the same activation as Node.engage, with the connections of every row summed in a single bincount
+                width = end - start
+                rows = (np.arange(batch)[:, None] * width + targets).ravel()
+                layer_values = np.bincount(rows, (values[:, sources] * weights).ravel(), batch * width)
+                values[:, start:end] = np.exp(layer_values).reshape(batch, width) + 1
+
+        return values[:, self.output_positions]
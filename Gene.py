@@ -9,6 +9,8 @@ class Gene:
     """
     A gene that represents the connection between 2 nodes.
     """
+    __slots__ = ("starting_node", "ending_node", "weight", "enabled", "innovation_number")
+
     starting_node: Node
     ending_node: Node
     weight: float
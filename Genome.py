@@ -1,11 +1,17 @@
 """
 The Neural Network
 """
-from typing import List, Union
+from typing import Dict, List, Set, Tuple, Union
 from random import choice, uniform
+from array import array
+from hashlib import blake2b
+import numpy as np
 from Node import Node
 from Gene import Gene
-from ConnectionHistory import ConnectionHistory
+from ConnectionHistory import InnovationHistory
+from CompactGenome import CompactGenome
+from FeedForwardPlan import FeedForwardPlan
+from mutation import default_generator, mutate_genome_weights
 
 
 class Genome:
@@ -13,7 +19,10 @@ class Genome:
     The Neural Network (game) of the game.
     """
     genes: List[Gene]
+    innovations: Dict[int, Gene]
     nodes: List[Node]
+    nodes_by_number: Dict[int, Node]
+    connections: Set[Tuple[int, int]]
     inputs: int
     outputs: int
     layers: int
@@ -21,6 +30,7 @@ class Genome:
     bias_node: int
     network: List[Node]
     is_crossover: bool
+    plan: Union[FeedForwardPlan, None]
 
     def __init__(self, inputs: int, outputs: int, is_crossover: bool=False) -> None:
         """
@@ -28,11 +38,14 @@ class Genome:
         """
         self.inputs, self.outputs = inputs, outputs
         self.genes, self.nodes = [], []
+        self.innovations, self.nodes_by_number = {}, {}
+        self.connections = set()
         self.layers = 2
         self.next_node = 0
         self.bias_node = self.next_node
         self.network = []
         self.is_crossover = is_crossover
+        self.plan = None
         self.initialize_nodes()
 
     def initialize_nodes(self) -> None:
@@ -42,17 +55,17 @@ class Genome:
 
         # input nodes
         for index in range(self.inputs):
-            self.nodes.append(Node(index))
+            self.add_node(Node(index))
             self.next_node += 1
             self.nodes[index].layer = 0
 
         # output nodes
         for index in range(self.outputs):
-            self.nodes.append(Node(index + self.inputs))
+            self.add_node(Node(index + self.inputs))
             self.next_node += 1
             self.nodes[index + self.inputs].layer = 1
 
-        self.nodes.append(Node(self.next_node))
+        self.add_node(Node(self.next_node))
         self.bias_node = self.next_node
         self.next_node += 1
         self.nodes[self.bias_node].layer = 0
@@ -61,35 +74,73 @@ class Genome:
         """
         Return the node with node number <node_number> if it exists, else return None.
         """
-        for node in self.nodes:
-            if node.number == node_number:
-                return node
+        return self.nodes_by_number.get(node_number)
+
+    def add_node(self, node: Node) -> None:
+        """
+        Add <node> to the nodes of this genome.
+        """
+        self.nodes.append(node)
+        self.nodes_by_number[node.number] = node
+
+    def clear(self) -> None:
+        """
+        Remove all of the nodes and genes of this genome.
+        """
+        self.genes, self.nodes = [], []
+        self.innovations, self.nodes_by_number = {}, {}
+        self.connections = set()
+        self.plan = None
+
+    def is_connected(self, node1: Node, node2: Node) -> bool:
+        """
+        Return whether or not there is a gene between <node1> and <node2>, in either direction.
+        """
+        return (node1.number, node2.number) in self.connections or (node2.number, node1.number) in self.connections
+
+    def add_gene(self, gene: Gene) -> None:
+        """
+        Add <gene> to the genes of this genome, which are kept sorted by innovation number and indexed by it, and
+        connect its starting node to it.
+        """
+        self.innovations[gene.innovation_number] = gene
+        self.connections.add((gene.starting_node.number, gene.ending_node.number))
+        gene.starting_node.outgoing_connections.append(gene)
+        self.plan = None
+
+        # new genes almost always have the largest innovation number, so search from the end
+        index = len(self.genes)
+        while index > 0 and self.genes[index - 1].innovation_number > gene.innovation_number:
+            index -= 1
+        self.genes.insert(index, gene)
 
     def connect_nodes(self) -> None:
         """
         Connect the nodes so that each node has reference to all its outgoing connections.
         """
 
+        # the compiled neural network no longer matches the connections
+        self.plan = None
+
         # clear the current connections
         for node in self.nodes:
             node.outgoing_connections = []
+        self.connections = set()
 
         # for each gene, add the gene to the starting_node of the gene so the starting_node has reference to its
         # outgoing profile
         for gene in self.genes:
             gene.starting_node.outgoing_connections.append(gene)
+            self.connections.add((gene.starting_node.number, gene.ending_node.number))
 
     def generate_neural_network(self) -> None:
         """
         Generate the neural network
         """
         self.connect_nodes()
-        for layer in range(self.layers):
-            for node in self.nodes:
-                if node.layer == layer:
-                    self.network.append(node)
+        self.network = sorted(self.nodes, key=lambda node: node.layer)
 
-    def mutate_by_node_addition(self, history: List) -> None:
+    def mutate_by_node_addition(self, history: InnovationHistory) -> None:
         """
         Mutate the neural network by:
             1. choose a random gene, then disable it
@@ -102,24 +153,21 @@ class Genome:
             # enough mutation for now!
             return
 
-        # pick a random gene to disable
-        gene_to_disable = choice(self.genes)
-
-        while gene_to_disable.starting_node is not self.nodes[self.bias_node] and len(self.genes) != 1:
-            gene_to_disable = choice(self.genes)
+        # pick a random gene to disable, without splitting the connections coming from the bias node if possible
+        bias_node = self.get_node(self.bias_node)
+        candidates = [gene for gene in self.genes if gene.starting_node is not bias_node]
+        gene_to_disable = choice(candidates if candidates != [] else self.genes)
 
         gene_to_disable.enabled = False
 
-        new_node_number = self.next_node
-        self.nodes.append(Node(new_node_number))
-        self.get_node(new_node_number).layer = gene_to_disable.starting_node.layer + 1
+        new_node = Node(self.next_node)
+        new_node.layer = gene_to_disable.starting_node.layer + 1
+        self.add_node(new_node)
         self.next_node += 1
 
-        new_node = self.get_node(new_node_number)
-
         # add a new connection from starting_node of gene_to_disable to new node with weight 1
         new_inno_num = self.get_inno_num(history, gene_to_disable.starting_node, new_node)
-        self.genes.append(
+        self.add_gene(
             Gene(
                 gene_to_disable.starting_node,
                 new_node,
@@ -129,7 +177,7 @@ class Genome:
 
         # add a new connection from new node to ending_node of gene_to_disable with weight of the disabled connection
         new_inno_num = self.get_inno_num(history, new_node, gene_to_disable.ending_node)
-        self.genes.append(
+        self.add_gene(
             Gene(
                 new_node,
                 gene_to_disable.ending_node,
@@ -138,10 +186,10 @@ class Genome:
         )
 
         # add connection from the bias node to the new node with a weight of 0
-        new_inno_num = self.get_inno_num(history, self.get_node(self.bias_node), self.get_node(new_node_number))
-        self.genes.append(
+        new_inno_num = self.get_inno_num(history, bias_node, new_node)
+        self.add_gene(
             Gene(
-                self.get_node(self.bias_node),
+                bias_node,
                 new_node,
                 0,
                 new_inno_num)
@@ -149,14 +197,13 @@ class Genome:
 
         # ensure that if the layer of the new node is the same as the layer of the disabled gene's ending node then
         # the layers of all nodes with layer >= than the the new node's layer need to be incremented
-        for node in self.nodes:
-            if node.layer >= new_node.layer:
-                node.layer += 1
-
-        # properly reconnect the nodes of the new neural network
-        self.connect_nodes()
+        if new_node.layer == gene_to_disable.ending_node.layer:
+            for node in self.nodes:
+                if node is not new_node and node.layer >= new_node.layer:
+                    node.layer += 1
+            self.layers += 1
 
-    def add_connection(self, history) -> None:
+    def add_connection(self, history: InnovationHistory) -> None:
         """
         Randomly add a connection between 2 nodes that are not yet connected.
         """
@@ -167,21 +214,17 @@ class Genome:
         node1 = choice(self.nodes)
         node2 = choice(self.nodes)
 
-        while node1.layer == node2.layer or node1.is_connected_to(node2):
+        while node1.layer == node2.layer or self.is_connected(node1, node2):
             node1 = choice(self.nodes)
             node2 = choice(self.nodes)
 
         # we want node1's layer to be < node2's layer
-        temp = None
         if node1.layer > node2.layer:
-            temp = node2
-            node1 = node2
-            node2 = temp
+            node1, node2 = node2, node1
 
         new_inno_num = self.get_inno_num(history, node1, node2)
         # add the new connection with a random weight
-        self.genes.append(Gene(node1, node2, uniform(-1, 1), new_inno_num))
-        self.connect_nodes()
+        self.add_gene(Gene(node1, node2, uniform(-1, 1), new_inno_num))
 
     def fully_connected(self) -> bool:
         """
@@ -198,39 +241,25 @@ class Genome:
         # times the number of nodes in the ending layer
         for starting_layer in range(self.layers - 1):
             num_avail_nodes = sum(node_in_each_layer[starting_layer + 1:])
-            maximum_connections += num_avail_nodes
+            maximum_connections += node_in_each_layer[starting_layer] * num_avail_nodes
 
         if maximum_connections == len(self.genes):
             return True
 
         return False
 
-    def get_inno_num(self, history, starting_node: Node, ending_node: Node) -> int:
+    def get_inno_num(self, history: InnovationHistory, starting_node: Node, ending_node: Node) -> int:
         """
         Return the innovation number that matches the connection between <starting_node> and <ending_node>. If such a
         connection already exists within <history>, returns the corresponding innovation that has been previously
         created. If not, create a new and unique innovation number to represent the new connection.
         """
-        new_connection = True
-        innovation_nos = [connection.innovation_number for connection in history]
-        innovation_no = max(innovation_nos) + 1
+        return history.innovation_number(self, starting_node, ending_node)
 
-        for connection in history:
-            if connection.matches(self, starting_node, ending_node):
-                new_connection = False
-                innovation_no = connection.innovation_number
-
-        new_inno_nums = []
-        if new_connection:
-            new_inno_nums = [gene.innovation_number for gene in self.genes]
-
-        history.append(ConnectionHistory(starting_node.number, ending_node.number, innovation_no, new_inno_nums))
-
-        return innovation_no
-
-    def fully_mutate(self, history) -> None:
+    def fully_mutate(self, history: InnovationHistory, rng: Union[np.random.Generator, None]=None) -> None:
         """
-        Mutate the genome!
+        Mutate the genome! The weights are mutated all at once with <rng>, or with the generator shared by the
+        mutations that are not given one.
         """
         # if there is no gene connection, add one
         if len(self.genes) == 0:
@@ -239,8 +268,7 @@ class Genome:
         roll1 = uniform(0, 1)
         # 80% chance that the weights within a genome is mutated
         if roll1 < 0.8:
-            for gene in self.genes:
-                gene.mutate_weight()
+            mutate_genome_weights([self], rng if rng is not None else default_generator())
 
         roll2 = uniform(0, 1)
         # 8% chance of adding a random new connection
@@ -257,7 +285,7 @@ class Genome:
         Returns the new genome that is the product of the cross over between the current genome and <spouse>.
         """
         offspring = Genome(self.inputs, self.outputs, True)
-        offspring.genes, offspring.nodes = [], []
+        offspring.clear()
         offspring.layers = self.layers
         offspring.next_node = self.next_node
         offspring.bias_node = self.bias_node
@@ -266,9 +294,8 @@ class Genome:
         gene_statuses = []
         for gene in self.genes:
             inherit_enabled = True
-            spouse_gene_index = self.matching_gene(spouse, gene.innovation_number)
-            if spouse_gene_index != -1:
-                spouse_gene = spouse.genes[spouse_gene_index]
+            spouse_gene = self.matching_gene(spouse, gene.innovation_number)
+            if spouse_gene is not None:
                 # if either the current genome's gene is disabled or the spouse's gene is disabled
                 if not (gene.enabled and spouse_gene.enabled):
                     # 75% chance of having this gene disabled in the offspring
@@ -288,35 +315,36 @@ class Genome:
             gene_statuses.append(inherit_enabled)
 
         # inherit all the nodes of this genome to the offspring's genome
-        offspring.nodes = [node.clone() for node in self.nodes]
+        for node in self.nodes:
+            offspring.add_node(node.clone())
 
         # clone the connections into the offspring's connections
         for info in zip(inheriting_genes, gene_statuses):
-            gene_to_add = info[0].clone(info[0].starting_node.number, info[0].ending_node.number)
+            gene_to_add = info[0].clone(offspring.get_node(info[0].starting_node.number),
+                                        offspring.get_node(info[0].ending_node.number))
             gene_to_add.enabled = info[1]
-            offspring.genes.append(gene_to_add)
+            offspring.add_gene(gene_to_add)
 
-        offspring.connect_nodes()
         return offspring
 
-    def matching_gene(self, spouse: "Genome", inno_num: int) -> int:
+    def matching_gene(self, spouse: "Genome", inno_num: int) -> Union[Gene, None]:
         """
-        Return the index of the gene with the innovation number <inno_num> within <spouse>'s gene, if it exists. Return
-        -1 if it does not exist.
+        Return the gene with the innovation number <inno_num> within <spouse>'s genes, if it exists. Return None if it
+        does not exist.
         """
-        for gene in spouse.genes:
-            if gene.innovation_number == inno_num:
-                return spouse.genes.index(gene)
-
-        return -1
+        return spouse.innovations.get(inno_num)
 
     def clone(self) -> "Genome":
         """
         Return a clone of this genome.
         """
         clone = Genome(self.inputs, self.outputs)
-        clone.nodes = [node.clone() for node in self.nodes]
-        clone.genes = [gene.clone(gene.starting_node, gene.ending_node) for gene in self.genes]
+        clone.clear()
+        for node in self.nodes:
+            clone.add_node(node.clone())
+        for gene in self.genes:
+            clone.add_gene(gene.clone(clone.get_node(gene.starting_node.number),
+                                      clone.get_node(gene.ending_node.number)))
         clone.layers = self.layers
         clone.next_node = self.next_node
         clone.bias_node = self.bias_node
@@ -324,21 +352,81 @@ class Genome:
 
         return clone
 
+    def to_compact(self) -> CompactGenome:
+        """
+        Return this genome as a compact genome, which is much smaller to keep and to pickle than the Node and Gene
+        objects.
+        """
+        return CompactGenome(self)
+
+    @staticmethod
+    def from_compact(compact: CompactGenome) -> "Genome":
+        """
+        Return the genome that was turned into <compact> by to_compact.
+        """
+        genome = Genome(compact.inputs, compact.outputs)
+        genome.layers, genome.next_node, genome.bias_node = compact.layers, compact.next_node, compact.bias_node
+
+        genome.clear()
+        for number, layer in zip(compact.node_numbers, compact.node_layers):
+            node = Node(number)
+            node.layer = layer
+            genome.add_node(node)
+
+        get_node = genome.get_node
+        for start, end, weight, enabled, innovation_number in zip(compact.starting_nodes, compact.ending_nodes,
+                                                                  compact.weights, compact.enabled,
+                                                                  compact.innovation_numbers):
+            gene = Gene(get_node(start), get_node(end), weight, innovation_number)
+            gene.enabled = bool(enabled)
+            genome.add_gene(gene)
+
+        return genome
+
+    def content_hash(self) -> bytes:
+        """
+        Return a digest of the innovation number, weight and enabled flag of every gene of this genome. Two genomes
+        with the same digest have the same neural network, so they get the same fitness on the same race.
+        """
+        genes = sorted(self.genes, key=lambda gene: gene.innovation_number)
+        digest = blake2b(digest_size=16)
+        digest.update(array("q", [self.inputs, self.outputs]).tobytes())
+        digest.update(array("q", [gene.innovation_number for gene in genes]).tobytes())
+        digest.update(array("d", [gene.weight for gene in genes]).tobytes())
+        digest.update(bytes(gene.enabled for gene in genes))
+        return digest.digest()
+
+    def compile(self) -> FeedForwardPlan:
+        """
+        Return the compiled neural network of this genome, compiling it if the connections or the weights have changed
+        since it was last compiled.
+        """
+        if self.plan is None:
+            self.plan = FeedForwardPlan(self)
+
+        return self.plan
+
     def neural_net_result(self, input_values: List[float]) -> List[float]:
         """
         Return the output of the neural network as a result of the set of input values <input_values>.
         """
+        return self.compile().evaluate_one(input_values).tolist()
+
+    def feed_forward(self, input_values: List[float]) -> List[float]:
+        """
+        Return the output of the neural network as a result of the set of input values <input_values>, engaging the
+        nodes one at a time instead of evaluating the compiled plan. This is much slower than neural_net_result, and is
+        kept as the reference that the compiled plans are checked against.
+        """
         for input_value in range(self.inputs):
-            self.nodes[input_value].output_value = input_values[input_value]
+            self.get_node(input_value).output_value = input_values[input_value]
 
-        self.nodes[self.bias_node].output_value = 1
+        self.get_node(self.bias_node).output_value = 1
 
         for node in self.network:
             node.engage()
 
-        output_values = []
-        for index in range(self.outputs):
-            output_values[index] = self.nodes[self.inputs + index].output_value
+        output_values = [self.get_node(self.inputs + index).output_value for index in range(self.outputs)]
 
         for node in self.nodes:
             node.input_sum = 0
@@ -1,18 +1,23 @@
 """
 Node class that is used in the Genome class.
 """
-from typing import List
-from math import exp
+from typing import List, TYPE_CHECKING
+from math import exp, inf
+
+if TYPE_CHECKING:
+    from Gene import Gene
 
 
 class Node:
     """
     A node in the neural network.
     """
+    __slots__ = ("number", "input_sum", "output_value", "outgoing_connections", "layer")
+
     number: int
     input_sum: float
     output_value: float
-    outgoing_connections: List[Gene]
+    outgoing_connections: List["Gene"]
     layer: int
 
     def __init__(self, number: int) -> None:
@@ -29,7 +34,11 @@ class Node:
         For each node that this node is connected to, this node will send its output to the connecting nodes
         """
         if self.layer != 0:
-            self.output_value = 1 + exp(-4.9 * self.input_sum)
+            try:
+                self.output_value = 1 + exp(-4.9 * self.input_sum)
+            except OverflowError:
+                # the output of a node with a very negative input sum saturates to infinity
+                self.output_value = inf
 
         for outgoing_connection in self.outgoing_connections:
             if outgoing_connection.enabled:
@@ -2,8 +2,11 @@
 A player class
 """
 from Genome import Genome
-from typing import List
+from typing import List, Union
+import numpy as np
+import observation
 from obstacle import Obstacle
+from simulation import RaceSimulation
 
 
 class Player:
@@ -21,7 +24,7 @@ class Player:
     generation: int
     genome_inputs: int
     genome_outputs: int
-    vision: List[float]
+    vision: np.ndarray
     decision: List[float]
     position_y: float
     position_x: float
@@ -35,6 +38,9 @@ class Player:
     history_counter: int
     local_obstacle_timer: int
     local_random_addition: int
+    race_seed: Union[int, None]
+
+    observer = observation.ObservationBuilder()
 
     def __init__(self) -> None:
         """
@@ -43,4 +49,102 @@ class Player:
         self.lifespan = 0
         self.best_score = 0
         self.generation = 0
-        self.genome_inputs =
+        self.genome_inputs = observation.inputs
+        self.genome_outputs = 4
+        self.brain = Genome(self.genome_inputs, self.genome_outputs)
+        self.brain.generate_neural_network()
+        self.fitness, self.unadjusted_fitness = 0, 0
+        self.replay = False
+        self.dead = False
+        self.score = 0
+        self.vision, self.decision = np.zeros(self.genome_inputs), []
+        self.position_x, self.position_y = 0, 0
+        self.speed = 0
+        self.height, self.width = 0, 0
+        self.run_count = 0
+        self.replay_obstacles = []
+        self.local_obstacle_history, self.local_random_addition_history = [], []
+        self.history_counter = 0
+        self.local_obstacle_timer = 0
+        self.local_random_addition = 0
+        self.race_seed = None
+
+    def look(self, race: RaceSimulation) -> None:
+        """
+        Look at the road of <race> ahead of Mario: how far he is from the edges of the road, his speeds and
+        accelerations, and how far the closest obstacle ahead of him in each lane is.
+        """
+        mario = race.mario
+        self.position_x, self.position_y = mario.x_cor, mario.y_cor
+        self.speed = mario.speed
+        self.width, self.height = mario.size
+
+        self.observer.observe(race, self.vision)
+
+    def think(self) -> List[bool]:
+        """
+        Decide on the commands to give to Mario from what this player sees. Return the commands as
+        (accelerating, decelerating, hor_accelerating, hor_decelerating).
+        """
+        self.decision = self.brain.neural_net_result(self.vision)
+
+        # an output is above 2 when the weighted sum into the output node is negative
+        return [output > 2 for output in self.decision]
+
+    def update(self, race: RaceSimulation, actions: List[bool]) -> None:
+        """
+        Give the commands <actions> to Mario in <race>.
+        """
+        self.dead = not race.step(actions)
+        self.lifespan += 1
+        self.score = int(race.background.travelled)
+        if self.score > self.best_score:
+            self.best_score = self.score
+
+    def play(self, race: RaceSimulation) -> None:
+        """
+        Race in <race> until Mario crashes.
+        """
+        while not self.dead:
+            self.look(race)
+            self.update(race, self.think())
+
+    def calculate_fitness(self) -> None:
+        """
+        Calculate the fitness of this player from how far it travelled.
+        """
+        self.fitness = self.score * self.score
+        self.unadjusted_fitness = self.fitness
+
+    def clone(self) -> "Player":
+        """
+        Return a clone of this player.
+        """
+        clone = Player()
+        clone.brain = self.brain.clone()
+        clone.fitness = self.fitness
+        clone.brain.generate_neural_network()
+        clone.generation = self.generation
+        clone.best_score = self.score
+        return clone
+
+    def clone_for_replay(self) -> "Player":
+        """
+        Return a clone of this player that replays its race.
+        """
+        clone = self.clone()
+        clone.replay = True
+        clone.race_seed = self.race_seed
+        clone.replay_obstacles = self.replay_obstacles[:]
+        clone.local_obstacle_history = self.local_obstacle_history[:]
+        clone.local_random_addition_history = self.local_random_addition_history[:]
+        return clone
+
+    def crossover(self, parent: "Player") -> "Player":
+        """
+        Return the child of this player and <parent>, where this player is the fitter parent.
+        """
+        child = Player()
+        child.brain = self.brain.crossover(parent.brain)
+        child.brain.generate_neural_network()
+        return child
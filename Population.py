@@ -0,0 +1,238 @@
+"""
+Population class that drives the evolution of the players
+"""
+from typing import Dict, List, Union
+from math import floor
+from time import perf_counter
+import random
+import numpy as np
+from ConnectionHistory import InnovationHistory
+from Player import Player
+from Species import Species
+from checkpoint import Checkpoint, CheckpointWriter
+from evaluation import SerialEvaluator
+from mutation import mutate_generation
+
+
+class Population:
+    """
+    A population of players that evolves one generation at a time: every player is evaluated, the players are divided
+    into species, the fitness is shared within each species, stale and bad species are culled, and each species gets a
+    share of the next generation in proportion to its average fitness.
+
+    The evaluator can be any object with evaluate(players, seed) and close(), such as a SerialEvaluator, a
+    ParallelEvaluator or a VectorizedEvaluator. The time spent in each phase of the last generation is kept in
+    timings, and the total time spent in each phase in total_timings.
+    """
+    players: List[Player]
+    species: List[Species]
+    history: InnovationHistory
+    generation: int
+    best_player: Union[Player, None]
+    best_score: int
+    generation_players: List[Player]
+    seed: int
+    rng: np.random.Generator
+    timings: Dict[str, float]
+    total_timings: Dict[str, float]
+
+    # a species that has not improved for this many generations is culled, unless it is one of the best 2
+    stale_generations = 15
+    phases = ("evaluate", "speciate", "share", "cull", "reproduce")
+
+    def __init__(self, size: int, evaluator=None, seed: Union[int, None]=None) -> None:
+        """
+        Initializes a population of <size> new players, evaluated by <evaluator> (a SerialEvaluator by default). The
+        random module is seeded with <seed> if it is given, since the genomes make their random choices with it, and
+        the generations are evaluated and mutated with a NumPy generator seeded with it.
+        """
+        if seed is not None:
+            random.seed(seed)
+        self.seed = seed if seed is not None else random.getrandbits(64)
+        self.rng = np.random.default_rng(self.seed)
+        self.evaluator = evaluator if evaluator is not None else SerialEvaluator()
+
+        self.history = InnovationHistory(1000)
+        self.generation = 1
+        self.best_player, self.best_score = None, 0
+        self.generation_players = []
+        self.species = []
+        self.timings = {phase: 0.0 for phase in self.phases}
+        self.total_timings = {phase: 0.0 for phase in self.phases}
+
+        self.players = [Player() for _ in range(size)]
+        mutate_generation([player.brain for player in self.players], self.history, self.rng)
+        for player in self.players:
+            player.brain.generate_neural_network()
+
+    def timed(self, phase: str, start: float) -> float:
+        """
+        Add the time since <start> to <phase>, and return the current time.
+        """
+        now = perf_counter()
+        self.timings[phase] += now - start
+        self.total_timings[phase] += now - start
+        return now
+
+    def evolve(self) -> None:
+        """
+        Evaluate the current generation and replace it with the next one.
+        """
+        self.timings = {phase: 0.0 for phase in self.phases}
+        start = perf_counter()
+
+        self.evaluator.evaluate(self.players, int(self.rng.integers(2 ** 63)))
+        start = self.timed("evaluate", start)
+
+        self.speciate()
+        start = self.timed("speciate", start)
+
+        self.sort_species()
+        self.cull_species()
+        self.set_best_player()
+        start = self.timed("share", start)
+
+        self.kill_stale_species()
+        self.kill_bad_species()
+        start = self.timed("cull", start)
+
+        self.reproduce()
+        self.timed("reproduce", start)
+
+    def run(self, generations: int, writer: Union[CheckpointWriter, None]=None) -> None:
+        """
+        Evolve the population for <generations> generations, saving checkpoints with <writer> if it is given.
+        """
+        for _ in range(generations):
+            self.evolve()
+            if writer is not None:
+                writer.maybe_save(self.generation, self.players, self.species, self.history, self.rng,
+                                  self.generation_players, self.best_score)
+
+        if writer is not None:
+            writer.wait()
+
+    def speciate(self) -> None:
+        """
+        Divide the players into species, starting a new species for every player that is not close enough to the rep
+        of any of the existing species.
+        """
+        for species in self.species:
+            species.players.clear()
+
+        for player in self.players:
+            for species in self.species:
+                if species.are_same_species(player.brain):
+                    species.add_to_species(player)
+                    break
+            else:
+                self.species.append(Species(player))
+
+        # the species that no player belongs to anymore are extinct
+        self.species = [species for species in self.species if species.players]
+
+    def sort_species(self) -> None:
+        """
+        Sort the players within each species by fitness, and the species by their best fitness.
+        """
+        for species in self.species:
+            species.sort_species()
+
+        self.species.sort(key=lambda species: species.best_fitness, reverse=True)
+
+    def cull_species(self) -> None:
+        """
+        Kill off the bottom half of each species and share the fitness within each species.
+        """
+        for species in self.species:
+            species.massacre()
+            species.fitness_sharing()
+            species.set_average()
+
+    def set_best_player(self) -> None:
+        """
+        Remember the best player of this generation, if it is the best player so far.
+        """
+        best = self.species[0].players[0]
+        best.generation = self.generation
+        if best.score >= self.best_score:
+            self.generation_players.append(best.clone_for_replay())
+            self.best_score = best.score
+            self.best_player = best.clone_for_replay()
+
+    def kill_stale_species(self) -> None:
+        """
+        Cull the species that have not improved for too long, except for the best 2 species.
+        """
+        self.species = self.species[:2] + [species for species in self.species[2:]
+                                           if species.staleness < self.stale_generations]
+
+    def average_fitness_sum(self) -> float:
+        """
+        Return the sum of the average fitness of every species.
+        """
+        return sum(species.average_fitness for species in self.species)
+
+    def kill_bad_species(self) -> None:
+        """
+        Cull the species that are so weak that they would not get a single offspring, except for the best species.
+        """
+        average_sum = self.average_fitness_sum()
+        if average_sum == 0:
+            return
+
+        self.species = self.species[:1] + [species for species in self.species[1:]
+                                           if species.average_fitness / average_sum * len(self.players) >= 1]
+
+    def reproduce(self) -> None:
+        """
+        Replace the players with the next generation: the champion of every species, and offspring of each species in
+        proportion to its average fitness.
+        """
+        average_sum = self.average_fitness_sum()
+        children, offspring = [], []
+        for species in self.species:
+            children.append(species.champion.clone_for_replay())
+            if average_sum > 0:
+                child_count = floor(species.average_fitness / average_sum * len(self.players)) - 1
+                for _ in range(child_count):
+                    offspring.append(species.breed())
+
+        # fill up the rest of the generation with offspring of the best species
+        while len(children) + len(offspring) < len(self.players):
+            offspring.append(self.species[0].breed())
+
+        # the champions are kept as they are, and the weights of all of the offspring are mutated together
+        offspring = offspring[:len(self.players) - len(children)]
+        mutate_generation([child.brain for child in offspring], self.history, self.rng)
+
+        self.players = (children + offspring)[:len(self.players)]
+        self.generation += 1
+        for player in self.players:
+            player.brain.generate_neural_network()
+
+    def close(self) -> None:
+        """
+        Release the resources of the evaluator.
+        """
+        self.evaluator.close()
+
+    @staticmethod
+    def resume(path: str, evaluator=None) -> "Population":
+        """
+        Return the population saved in the checkpoint at <path>, ready to evolve its next generation with
+        <evaluator>, along with its best players so far.
+        """
+        with Checkpoint(path) as checkpoint:
+            population = Population(0, evaluator)
+            population.players = checkpoint.players()
+            population.species = checkpoint.species(population.players)
+            population.history = checkpoint.history()
+            population.generation = checkpoint.generation
+            population.generation_players = checkpoint.best_players()
+            population.best_score = checkpoint.best_score
+            if checkpoint.best_count > 0:
+                population.best_player = checkpoint.best_players()[-1]
+            checkpoint.restore_random_state(population.rng)
+
+        return population
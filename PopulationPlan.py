@@ -0,0 +1,91 @@
+"""
+The compiled neural networks of a whole population, evaluated together.
+"""
+from typing import Dict, List, Tuple
+import numpy as np
+from Genome import Genome
+
+
+class PopulationPlan:
+    """
+    The FeedForwardPlans of many genomes, padded into shared blocks so that the whole population can make its
+    decisions with a single sum over the connections of every genome per layer instead of one call per genome.
+
+    Genomes whose networks have the same number of layers form a group. Within a group every layer is padded to the
+    widest version of that layer, and the padding nodes have no connections so they never change the result. The
+    connections of a layer are kept as flat positions into the node values of the whole group, so that, like in a
+    FeedForwardPlan, only the connections that really end in a node are added up.
+    """
+    genome_count: int
+    inputs: int
+    outputs: int
+    groups: List[Tuple[np.ndarray, List[Tuple[int, int, np.ndarray, np.ndarray, np.ndarray]], np.ndarray, np.ndarray]]
+
+    def __init__(self, genomes: List[Genome]) -> None:
+        """
+        Compile and group the neural networks of <genomes>.
+        """
+        self.genome_count = len(genomes)
+        self.inputs, self.outputs = genomes[0].inputs, genomes[0].outputs
+
+        members: Dict[int, List[int]] = {}
+        for index, genome in enumerate(genomes):
+            members.setdefault(len(genome.compile().layers), []).append(index)
+
+        self.groups = []
+        for depth, indices in members.items():
+            plans = [genomes[index].plan for index in indices]
+
+            # the padded bounds of each layer
+            bounds = []
+            start = self.inputs + 1
+            for layer in range(depth):
+                width = max(plan.layers[layer][1] - plan.layers[layer][0] for plan in plans)
+                bounds.append((start, start + width))
+                start += width
+            node_count = start
+
+            # the flat positions of the starting node and of the ending node of every connection of each layer, and
+            # their weights
+            connections = [([], [], []) for _ in bounds]
+            output_positions = np.empty((len(plans), self.outputs), dtype=np.intp)
+            for row, plan in enumerate(plans):
+                # where each node of this plan sits in the padded layout
+                padded = np.arange(plan.node_count)
+                for (start, end, _, _, _), (padded_start, _) in zip(plan.layers, bounds):
+                    padded[start:end] = np.arange(padded_start, padded_start + end - start)
+
+                for (_, _, plan_sources, plan_targets, plan_weights), (start, end), (sources, targets, weights) in \
+                        zip(plan.layers, bounds, connections):
+                    sources.append(row * node_count + padded[plan_sources])
+                    targets.append(row * (end - start) + plan_targets)
+                    weights.append(plan_weights)
+                output_positions[row] = padded[plan.output_positions]
+
+            layers = [(start, end, np.concatenate(sources), np.concatenate(targets), np.concatenate(weights))
+                      for (start, end), (sources, targets, weights) in zip(bounds, connections)]
+            self.groups.append((np.array(indices, dtype=np.intp), layers, output_positions,
+                                np.empty((len(plans), node_count))))
+
+    def evaluate(self, observations: np.ndarray) -> np.ndarray:
+        """
+        Return the decisions of every genome, where row i of <observations> is the input of genome i. The result has
+        a shape of (genomes, outputs).
+        """
+        observations = np.asarray(observations, dtype=float)
+        decisions = np.empty((self.genome_count, self.outputs))
+
+        # a node whose input sum is too large saturates to infinity, like Node.engage
+        with np.errstate(over="ignore"):
+            for indices, layers, output_positions, values in self.groups:
+                values[:, :self.inputs] = observations[indices]
+                values[:, self.inputs] = 1
+                flat_values = values.reshape(-1)
+                for start, end, sources, targets, weights in layers:
+                    # the same activation as Node.engage
+                    layer_values = np.bincount(targets, flat_values[sources] * weights, len(values) * (end - start))
+                    values[:, start:end] = np.exp(layer_values).reshape(len(values), end - start) + 1
+
+                decisions[indices] = np.take_along_axis(values, output_positions, axis=1)
+
+        return decisions
@@ -1,10 +1,13 @@
 """
 Species class
 """
-from typing import List, Union
-from random import uniform
+from typing import List, Tuple, Union
+from bisect import bisect_right
+from itertools import accumulate
+from random import choice, uniform
+import numpy as np
 from Genome import Genome
-from ConnectionHistory import ConnectionHistory
+from ConnectionHistory import InnovationHistory
 from Player import Player
 
 
@@ -13,6 +16,7 @@ class Species:
     A species with distinct properties.
     """
     players: List[Player]
+    cumulative_fitness: Union[List[float], None]
     best_fitness: float
     champion: Player
     average_fitness: float
@@ -26,6 +30,8 @@ class Species:
         """
         Initializes a new species.
         """
+        self.players = []
+        self.cumulative_fitness = None
         self.best_fitness, self.average_fitness, self.staleness, self.excess_coefficient, \
             self.weight_difference_coefficient, self.compatibility_threshold = 0, 0, 0, 1, 0.5, 3
         if player is not None:
@@ -38,11 +44,18 @@ class Species:
         """
         Return whether or not <genome> is in this species.
         """
+        excess, disjoint, matching, total_weight_difference = self.compare_genes(genome, self.rep)
+
         # the number of excess & disjoint genes between the genome and this species' rep
-        excess_and_disjoint = self.get_excess_disjoint(genome, self.rep)
+        excess_and_disjoint = excess + disjoint
 
         # the average weight difference between the matching genes
-        average_weight_difference = self.average_weight_difference(genome, self.rep)
+        if len(genome.genes) == 0 or len(self.rep.genes) == 0:
+            average_weight_difference = 0
+        elif matching == 0:
+            average_weight_difference = 100
+        else:
+            average_weight_difference = total_weight_difference/matching
 
         gene_normalizer = len(genome.genes) - 20
         if gene_normalizer < 1:
@@ -58,18 +71,44 @@ class Species:
         Add a new player to the species.
         """
         self.players.append(player)
+        self.cumulative_fitness = None
+
+    def compare_genes(self, genome1: Genome, genome2: Genome) -> Tuple[int, int, int, float]:
+        """
+        Return the number of excess genes, disjoint genes and matching genes between <genome1> and <genome2>, and the
+        total weight difference between their matching genes.
+
+        Both genomes keep their genes sorted by innovation number, so they are compared in a single merge pass.
+        """
+        genes1, genes2 = genome1.genes, genome2.genes
+        index1, index2 = 0, 0
+        disjoint, matching, total_weight_difference = 0, 0, 0.0
+        while index1 < len(genes1) and index2 < len(genes2):
+            gene1, gene2 = genes1[index1], genes2[index2]
+            if gene1.innovation_number == gene2.innovation_number:
+                matching += 1
+                total_weight_difference += abs(gene1.weight - gene2.weight)
+                index1 += 1
+                index2 += 1
+            elif gene1.innovation_number < gene2.innovation_number:
+                disjoint += 1
+                index1 += 1
+            else:
+                disjoint += 1
+                index2 += 1
+
+        # the genes beyond the end of the other genome are excess genes
+        excess = len(genes1) - index1 + len(genes2) - index2
+
+        return excess, disjoint, matching, total_weight_difference
 
     def get_excess_disjoint(self, genome1: Genome, genome2: Genome) -> float:
         """
         Return the number of excess and disjoint genes between <genome1> and <genome2>
         """
-        matching = 0.0
-        for gene1 in genome1.genes:
-            for gene2 in genome2.genes:
-                if gene1.innovation_number == gene2.innovation_number:
-                    matching += 1
+        excess, disjoint, _, _ = self.compare_genes(genome1, genome2)
 
-        return len(genome1.genes) + len(genome2.genes) - 2 * matching
+        return excess + disjoint
 
     def average_weight_difference(self, genome1: Genome, genome2: Genome) -> float:
         """
@@ -78,13 +117,7 @@ class Species:
         if len(genome1.genes) == 0 or len(genome2.genes) == 0:
             return 0
 
-        matching, total_difference = 0, 0
-        for gene1 in genome1.genes:
-            for gene2 in genome2.genes:
-                if gene1.innovation_number == gene2.innovation_number:
-                    matching += 1
-                    total_difference += abs(gene1.weight - gene2.weight)
-                    break
+        _, _, matching, total_difference = self.compare_genes(genome1, genome2)
 
         if matching == 0:
             return 100
@@ -95,18 +128,9 @@ class Species:
         """
         Sort the species by fitness.
         """
-        sorted_players = []
-        players = [player for player in self.players]
-        fitness = [player.fitness for player in self.players]
-        while players != []:
-            max_fitness = max(fitness)
-            index = fitness.index(max_fitness)
-            sorted_players.append(players.pop(index))
-            fitness.pop(index)
-
-        self.players.clear()
-        for player in sorted_players:
-            self.players.append(player)
+        # a stable sort keeps players with the same fitness in the order they were added
+        self.players.sort(key=lambda player: player.fitness, reverse=True)
+        self.cumulative_fitness = None
 
         if self.players == []:
             self.staleness = 0
@@ -130,9 +154,18 @@ class Species:
 
         self.average_fitness = total/(len(self.players)) if self.players != [] else 0
 
-    def make_offsprings(self, history: List[ConnectionHistory]) -> Player:
+    def make_offsprings(self, history: InnovationHistory, rng: Union[np.random.Generator, None]=None) -> Player:
+        """
+        Returns the offspring that is the result of 1 or more players of this species, with its weights mutated with
+        <rng> if it is given.
+        """
+        offspring = self.breed()
+        offspring.brain.fully_mutate(history, rng)
+        return offspring
+
+    def breed(self) -> Player:
         """
-        Returns the offspring that is the result of 1 or more players of this species.
+        Returns the offspring that is the result of 1 or more players of this species, before it is mutated.
         """
         offspring = None
         if uniform(0, 1) < 0.25:
@@ -146,30 +179,34 @@ class Species:
             else:
                 offspring = parent1.crossover(parent2)
 
-        offspring.brain.mutate(history)
         return offspring
 
     def select_player(self) -> Player:
         """
         Select a player from all the players based on the fitness
         """
-        fitness = 0
-        for player in self.players:
-            fitness += player.fitness
+        # the running totals of the fitness are only summed once for all of the selections of a generation
+        if self.cumulative_fitness is None:
+            self.cumulative_fitness = list(accumulate(player.fitness for player in self.players))
+        fitness = self.cumulative_fitness[-1]
 
+        # no player is fitter than the others
+        if fitness == 0:
+            return choice(self.players)
+
+        # the first player whose running total is above <random>
         random = uniform(0, fitness)
-        random_fitness = 0
-        for player in self.players:
-            random_fitness += player.fitness
-            if random_fitness > random:
-                return player
+        index = bisect_right(self.cumulative_fitness, random)
+
+        # <random> can only reach the total fitness through rounding
+        return self.players[min(index, len(self.players) - 1)]
 
     def massacre(self) -> None:
         """
         Kill off the bottom half of the species.
         """
-        for player in self.players[len(self.players) // 2 + 1:]:
-            self.players.remove(player)
+        del self.players[len(self.players) // 2 + 1:]
+        self.cumulative_fitness = None
 
     def fitness_sharing(self) -> None:
         """
@@ -177,3 +214,4 @@ class Species:
         """
         for player in self.players:
             player.fitness /= len(self.players)
+        self.cumulative_fitness = None
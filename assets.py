@@ -0,0 +1,67 @@
+"""
+Process-wide cache of the sprites used by the game
+"""
+from typing import Dict, Tuple
+from threading import Lock
+import struct
+import pygame
+
+# the decoded sprites, the sizes of the sprites and their collision masks, by path
+surfaces: Dict[str, pygame.Surface] = {}
+sizes: Dict[str, Tuple[int, int]] = {}
+masks: Dict[str, pygame.mask.Mask] = {}
+# headless races build masks on their own threads, for instance while a spectator is drawing
+masks_lock = Lock()
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+
+
+def load_image(path: str) -> pygame.Surface:
+    """
+    Return the sprite at <path>, which is shared by everything that uses it. The sprite is only decoded the first time
+    it is asked for, and is converted to the pixel format of the display if there is one.
+    """
+    image = surfaces.get(path)
+    if image is None:
+        image = pygame.image.load(path)
+        if pygame.display.get_init() and pygame.display.get_surface() is not None:
+            image = image.convert_alpha() if image.get_alpha() is not None else image.convert()
+        surfaces[path] = image
+        sizes[path] = image.get_size()
+
+    return image
+
+
+def image_size(path: str) -> Tuple[int, int]:
+    """
+    Return the (width, height) of the sprite at <path>. The size of a PNG is read from its header, so its pixels are
+    never decoded.
+    """
+    size = sizes.get(path)
+    if size is None:
+        with open(path, "rb") as image_file:
+            header = image_file.read(24)
+        if header[:8] == PNG_SIGNATURE:
+            size = struct.unpack(">II", header[16:24])
+            sizes[path] = size
+        else:
+            size = load_image(path).get_size()
+
+    return size
+
+
+def load_mask(path: str) -> pygame.mask.Mask:
+    """
+    Return the collision mask of the sprite at <path>, which has a bit set for every pixel of the sprite that is not
+    transparent. The mask is only built the first time it is asked for, from a copy of the sprite that is decoded for
+    the mask alone and then dropped, so building it never puts an unconverted sprite into the shared surfaces.
+    """
+    mask = masks.get(path)
+    if mask is None:
+        with masks_lock:
+            mask = masks.get(path)
+            if mask is None:
+                mask = pygame.mask.from_surface(pygame.image.load(path))
+                masks[path] = mask
+
+    return mask
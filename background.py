@@ -1,7 +1,7 @@
 """
 Class for background image
 """
-import pygame
+import assets
 
 
 class Background:
@@ -9,11 +9,11 @@ class Background:
     Background for Mario Kart 2D game!
     """
 
-    def __init__(self, path: str, x_cor, y_cor) -> None:
+    def __init__(self, path: str, x_cor, y_cor, headless: bool=False) -> None:
         """
-        Initializes a background.
+        Initializes a background. A <headless> background has no image.
         """
-        self.img = pygame.image.load(path)
+        self.img = None if headless else assets.load_image(path)
         self.x_cor, self.y_cor = x_cor, y_cor
         self.speed = 0
         self.travelled = 0
@@ -0,0 +1,247 @@
+"""
+Many headless races that are stepped together with NumPy
+"""
+from typing import List, Tuple, Union
+from itertools import permutations
+import numpy as np
+import assets
+from mario import Mario
+from obstacle import images
+from simulation import RaceSimulation
+
+
+def row_x_distribution(eligible_x: List[int]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Return every possible set of x coordinates for a row of 3 obstacles together with its probability, following the
+    way choose_obstacle_coordinates draws from and then reshuffles its list of eligible x coordinates.
+    """
+    outcomes = {}
+
+    def expand(curr_ok_x: List[int], chosen: Tuple[int, ...], probability: float) -> None:
+        if len(chosen) == 3:
+            outcomes[chosen] = outcomes.get(chosen, 0) + probability
+            return
+        for x in set(curr_ok_x):
+            next_ok_x = curr_ok_x[:]
+            next_ok_x.remove(x)
+            next_ok_x.extend(next_ok_x)
+            next_ok_x.append(x)
+            expand(next_ok_x, chosen + (x,), probability * curr_ok_x.count(x) / len(curr_ok_x))
+
+    expand(eligible_x[:], (), 1.0)
+    rows = sorted(outcomes)
+    return np.array(rows, dtype=float), np.array([outcomes[row] for row in rows])
+
+
+class BatchRaceSimulation:
+    """
+    <size> races that follow the rules of RaceSimulation, with the state of every kart and its obstacles held in
+    NumPy arrays so that a tick of all of the races is a single set of array operations.
+
+    The actions passed to step are an array of shape (size, 4) holding (accelerating, decelerating,
+    hor_accelerating, hor_decelerating) for each kart. Each kart keeps at most <max_rows> rows of obstacles; when
+    more rows are alive than that, the oldest row is replaced.
+    """
+    size: int
+    max_rows: int
+    x_cor: np.ndarray
+    speed: np.ndarray
+    acceleration: np.ndarray
+    hor_speed: np.ndarray
+    hor_acceleration: np.ndarray
+    background_y: np.ndarray
+    travelled: np.ndarray
+    obstacle_generate_threshold: np.ndarray
+    score: np.ndarray
+    idle_time: np.ndarray
+    crash: np.ndarray
+    rows_generated: np.ndarray
+    obstacle_x: np.ndarray
+    obstacle_y: np.ndarray
+    obstacle_width: np.ndarray
+    obstacle_height: np.ndarray
+    obstacle_alive: np.ndarray
+    obstacle_sprite: np.ndarray
+    obstacle_lane: np.ndarray
+
+    start_x = 266
+    mario_y = 680
+    background_start_y = -1000
+    eligible_x = [120, 240, 355]
+    eligible_y = [30 - 750, 300 - 750, 620 - 720]
+
+    def __init__(self, size: int, seed: Union[int, None]=None, max_rows: int=8) -> None:
+        """
+        Initializes <size> new races.
+        """
+        self.size, self.max_rows = size, max_rows
+        self.rng = np.random.default_rng(seed)
+
+        mario_size = assets.image_size(Mario.image_path)
+        self.mario_width, self.mario_height = float(mario_size[0]), float(mario_size[1])
+        sprite_sizes = [assets.image_size(image) for image in images]
+        self.sprite_widths = np.array([size[0] for size in sprite_sizes], dtype=float)
+        self.sprite_heights = np.array([size[1] for size in sprite_sizes], dtype=float)
+        self.mario_mask = assets.load_mask(Mario.image_path)
+        self.sprite_masks = [assets.load_mask(image) for image in images]
+
+        self.row_xs, self.row_x_probabilities = row_x_distribution(self.eligible_x)
+        self.row_ys = np.array(list(permutations(self.eligible_y)), dtype=float)
+        self.lane_x = np.array(sorted(self.eligible_x), dtype=float)
+
+        self.reset()
+
+    def reset(self) -> None:
+        """
+        Start all of the races over again.
+        """
+        size, slots = self.size, self.max_rows * 3
+        self.x_cor = np.full(size, float(self.start_x))
+        self.speed, self.acceleration = np.zeros(size), np.zeros(size)
+        self.hor_speed, self.hor_acceleration = np.zeros(size), np.zeros(size)
+        self.background_y = np.full(size, float(self.background_start_y))
+        self.travelled = np.zeros(size)
+        self.obstacle_generate_threshold = np.full(size, float(RaceSimulation.obstacle_spacing))
+        self.score = np.zeros(size, dtype=np.int64)
+        self.idle_time = np.zeros(size, dtype=np.int64)
+        self.crash = np.zeros(size, dtype=bool)
+        self.rows_generated = np.zeros(size, dtype=np.int64)
+
+        self.obstacle_x, self.obstacle_y = np.zeros((size, slots)), np.zeros((size, slots))
+        self.obstacle_width, self.obstacle_height = np.zeros((size, slots)), np.zeros((size, slots))
+        self.obstacle_alive = np.zeros((size, slots), dtype=bool)
+        self.obstacle_sprite = np.zeros((size, slots), dtype=np.intp)
+        self.obstacle_lane = np.zeros((size, slots), dtype=np.intp)
+
+        self.generate_obstacles(np.arange(size))
+
+    def generate_obstacles(self, karts: np.ndarray) -> None:
+        """
+        Generate a new row of obstacles at the top of the road for each kart in <karts>.
+        """
+        count = len(karts)
+        if count == 0:
+            return
+
+        xs = self.row_xs[self.rng.choice(len(self.row_xs), size=count, p=self.row_x_probabilities)]
+        ys = self.row_ys[self.rng.integers(len(self.row_ys), size=count)]
+        sprites = self.rng.integers(len(self.sprite_widths), size=(count, 3))
+
+        # the columns of the slots the new row is written into
+        columns = (self.rows_generated[karts] % self.max_rows)[:, None] * 3 + np.arange(3)
+        rows = karts[:, None]
+        self.obstacle_x[rows, columns], self.obstacle_y[rows, columns] = xs, ys
+        self.obstacle_width[rows, columns] = self.sprite_widths[sprites]
+        self.obstacle_height[rows, columns] = self.sprite_heights[sprites]
+        self.obstacle_sprite[rows, columns] = sprites
+        self.obstacle_lane[rows, columns] = np.searchsorted(self.lane_x, xs)
+        self.obstacle_alive[rows, columns] = True
+        self.rows_generated[karts] += 1
+
+    def move_background(self, moving: np.ndarray) -> None:
+        """
+        Move the backgrounds of the karts in <moving> by their current speed.
+        """
+        old_y = self.background_y
+        self.background_y = np.where(moving, old_y + self.speed, old_y)
+        self.travelled += np.where(old_y <= self.background_y, self.background_y - old_y, 0.0)
+
+    def step(self, actions: np.ndarray) -> np.ndarray:
+        """
+        Advance every race by a single tick with the commands <actions>. Return which karts are still racing.
+        """
+        actions = np.asarray(actions, dtype=bool)
+        accelerating, decelerating = actions[:, 0], actions[:, 1]
+        hor_accelerating, hor_decelerating = actions[:, 2], actions[:, 3]
+
+        active = ~self.crash
+        self.score += active
+
+        # Mario should not be idle (vertically) for too long, and his idle time resets once he is moved
+        self.idle_time = np.where(active, np.where(self.speed == 0, self.idle_time + 1, 0), self.idle_time)
+
+        # Mario cannot crash to the sides nor stay idle for too long
+        self.crash |= active & ((self.x_cor <= RaceSimulation.left_bound) |
+                                (self.x_cor >= RaceSimulation.right_bound) |
+                                (self.idle_time >= RaceSimulation.max_idle_time))
+        active = ~self.crash
+
+        # go back to the beginning of the background to make the game go on forever
+        wrap = active & (self.background_y >= -410) & (self.background_y <= -375)
+        self.background_y[wrap] = self.background_start_y
+
+        # accelerating vertically
+        moving = active & accelerating
+        acceleration = np.where(self.acceleration < 0, 0.0,
+                                np.where(self.acceleration < 15, self.acceleration + 0.05, self.acceleration))
+        self.acceleration = np.where(moving, acceleration, self.acceleration)
+        self.speed = np.where(moving & (self.acceleration >= 0) & (self.speed < 15),
+                              self.speed + self.acceleration, self.speed)
+        self.move_background(moving)
+
+        # decelerating vertically
+        moving = active & decelerating
+        acceleration = np.where(self.acceleration > 0, 0.0,
+                                np.where(self.acceleration > -15, self.acceleration - 0.08, self.acceleration))
+        self.acceleration = np.where(moving, acceleration, self.acceleration)
+        self.speed = np.where(moving & (self.acceleration < 0) & (self.speed > -15),
+                              self.speed + self.acceleration, self.speed)
+        self.move_background(moving)
+
+        # no vertical command, but still moving
+        moving = active & ~accelerating & ~decelerating & (self.speed != 0)
+        speed = np.where(np.abs(self.speed) >= 0.5, self.speed * 0.5, 0.0)
+        self.speed = np.where(moving, speed, self.speed)
+        self.move_background(moving)
+
+        # accelerating horizontally
+        moving = active & hor_accelerating
+        hor_acceleration = np.where((self.hor_acceleration >= 0) & (self.hor_acceleration < 1),
+                                    self.hor_acceleration + 0.1,
+                                    np.where(self.hor_acceleration < 0, 0.1, self.hor_acceleration))
+        self.hor_acceleration = np.where(moving, hor_acceleration, self.hor_acceleration)
+        self.hor_speed = np.where(moving & (self.hor_acceleration >= 0) & (self.hor_speed < 7),
+                                  self.hor_speed + self.hor_acceleration, self.hor_speed)
+        self.x_cor = np.where(moving, self.x_cor + self.hor_speed, self.x_cor)
+
+        # decelerating horizontally
+        moving = active & hor_decelerating
+        hor_acceleration = np.where((self.hor_acceleration <= 0) & (self.hor_acceleration > -1),
+                                    self.hor_acceleration - 0.1,
+                                    np.where(self.hor_acceleration > 0, -0.1, self.hor_acceleration))
+        self.hor_acceleration = np.where(moving, hor_acceleration, self.hor_acceleration)
+        self.hor_speed = np.where(moving & (self.hor_acceleration < 0) & (self.hor_speed > -7),
+                                  self.hor_speed + self.hor_acceleration, self.hor_speed)
+        self.x_cor = np.where(moving, self.x_cor + self.hor_speed, self.x_cor)
+
+        # no horizontal command, but still moving
+        moving = active & ~hor_accelerating & ~hor_decelerating & (self.hor_speed != 0)
+        hor_speed = np.where(np.abs(self.hor_speed) >= 0.3, self.hor_speed * 0.5, 0.0)
+        self.hor_speed = np.where(moving, hor_speed, self.hor_speed)
+        self.x_cor = np.where(moving, self.x_cor + self.hor_speed, self.x_cor)
+
+        # move the obstacles with the background, and remove the ones that have been passed
+        self.obstacle_y += np.where(active, self.speed, 0.0)[:, None]
+        self.obstacle_alive &= ~(active[:, None] & (self.obstacle_y > RaceSimulation.screen_height))
+
+        # generate more obstacles as the karts travel through the map
+        spawning = active & (self.travelled >= self.obstacle_generate_threshold)
+        self.obstacle_generate_threshold[spawning] += RaceSimulation.obstacle_spacing
+        self.generate_obstacles(np.flatnonzero(spawning))
+
+        # collisions between the karts and their obstacles
+        mario_right = self.x_cor + self.mario_width
+        mario_bottom = self.mario_y + self.mario_height
+        check_x_ok = (self.obstacle_x + self.obstacle_width < self.x_cor[:, None]) | \
+            (self.obstacle_x > mario_right[:, None])
+        check_y_ok = (self.obstacle_y + self.obstacle_height < self.mario_y) | (self.obstacle_y > mario_bottom)
+        colliding = active[:, None] & self.obstacle_alive & ~(check_x_ok | check_y_ok)
+
+        # only the few obstacles whose bounding boxes overlap a kart have their collision masks compared
+        for kart, slot in np.argwhere(colliding).tolist():
+            offset = (int(self.obstacle_x[kart, slot]) - int(self.x_cor[kart]),
+                      int(self.obstacle_y[kart, slot]) - self.mario_y)
+            if self.mario_mask.overlap(self.sprite_masks[self.obstacle_sprite[kart, slot]], offset) is not None:
+                self.crash[kart] = True
+
+        return ~self.crash
@@ -0,0 +1,248 @@
+"""
+Seeded, headless benchmarks of the race simulation and the NEAT hot paths, reported as JSON
+
+Usage:
+    python benchmarks.py [--seed SEED] [--repeat N] [--population-sizes 25 50 100] [--output results.json]
+"""
+from typing import Callable, Dict, List, Union
+from time import perf_counter
+import argparse
+import json
+import os
+import platform
+import random
+
+# pygame greets on stdout when it is imported, which would corrupt the JSON
+os.environ.setdefault("PYGAME_HIDE_SUPPORT_PROMPT", "1")
+
+import numpy as np
+import pygame
+from ConnectionHistory import InnovationHistory
+from evaluation import EvaluationBudget, SerialEvaluator
+from Genome import Genome
+from Player import Player
+from Population import Population
+from simulation import RaceSimulation, collision_between
+from Species import Species
+
+# the number of genes of the genomes that the neural network and the NEAT operators are measured on
+genome_sizes = (8, 32, 128, 512)
+population_sizes = (25, 50, 100)
+
+
+def best_time(function: Callable[[], object], repeat: int) -> float:
+    """
+    Return the shortest of <repeat> wall times of calling <function>, in seconds. The shortest time is the one least
+    disturbed by the rest of the machine.
+    """
+    times = []
+    for _ in range(repeat):
+        start = perf_counter()
+        function()
+        times.append(perf_counter() - start)
+
+    return min(times)
+
+
+def grown_genome(history: InnovationHistory, gene_count: int) -> Genome:
+    """
+    Return a new genome of a player, grown with random connection and node additions until it has at least
+    <gene_count> genes.
+    """
+    genome = Player().brain
+    while len(genome.genes) < gene_count:
+        if genome.fully_connected() or random.random() < 0.2:
+            genome.mutate_by_node_addition(history)
+        else:
+            genome.add_connection(history)
+
+    genome.generate_neural_network()
+    return genome
+
+
+def race_actions(rng: random.Random, count: int) -> List[tuple]:
+    """
+    Return <count> seeded commands that keep Mario accelerating while steering him at random.
+    """
+    return [(rng.random() < 0.9, False, rng.random() < 0.3, rng.random() < 0.3) for _ in range(count)]
+
+
+def bench_race_step(seed: int, repeat: int, ticks: int=20000) -> Dict[str, float]:
+    """
+    Return how many ticks per second a headless RaceSimulation steps through, starting a new race whenever Mario
+    crashes, and how many collision checks per second collision_between makes against the obstacles on the road.
+    """
+    rng = random.Random(seed)
+    actions = race_actions(rng, ticks)
+    race_seeds = [rng.getrandbits(64) for _ in range(ticks)]
+
+    def run_races() -> None:
+        races = iter(race_seeds)
+        race = RaceSimulation(seed=next(races))
+        for tick_actions in actions:
+            if not race.step(tick_actions):
+                race = RaceSimulation(seed=next(races))
+
+    # a road full of obstacles, and Mario at seeded positions around the bottom of it
+    race = RaceSimulation(seed=seed)
+    for tick_actions in actions[:200]:
+        if not race.step(tick_actions):
+            break
+    positions = [(rng.uniform(race.left_bound, race.right_bound), rng.uniform(0, race.screen_height))
+                 for _ in range(1000)]
+    obstacles = race.obstacles
+    mario = race.mario
+
+    def check_collisions() -> None:
+        for x, y in positions:
+            mario.x_cor, mario.y_cor = x, y
+            for obstacle in obstacles:
+                collision_between(mario, obstacle)
+
+    return {"ticks_per_second": ticks / best_time(run_races, repeat),
+            "collision_checks_per_second": len(positions) * len(obstacles) / best_time(check_collisions, repeat)}
+
+
+def bench_neural_network(genomes: List[Genome], repeat: int, calls: int=5000) -> List[Dict[str, float]]:
+    """
+    Return how many times per second neural_net_result is called for each genome in <genomes>, on seeded inputs.
+    """
+    rng = random.Random(len(genomes))
+    results = []
+    for genome in genomes:
+        inputs = [[rng.uniform(-1, 1) for _ in range(genome.inputs)] for _ in range(calls)]
+
+        def think() -> None:
+            for input_values in inputs:
+                genome.neural_net_result(input_values)
+
+        results.append({"genes": len(genome.genes), "nodes": len(genome.nodes),
+                        "calls_per_second": calls / best_time(think, repeat)})
+
+    return results
+
+
+def bench_compatibility(genomes: List[Genome], history: InnovationHistory, repeat: int,
+                        pairs: int=2000) -> List[Dict[str, float]]:
+    """
+    Return how many times per second get_excess_disjoint and average_weight_difference compare a genome of each size
+    in <genomes> with a mutated clone of itself.
+    """
+    species = Species()
+    results = []
+    for genome in genomes:
+        other = genome.clone()
+        for _ in range(5):
+            other.add_connection(history)
+        other.fully_mutate(history, np.random.default_rng(len(genome.genes)))
+
+        def excess_disjoint() -> None:
+            for _ in range(pairs):
+                species.get_excess_disjoint(genome, other)
+
+        def weight_difference() -> None:
+            for _ in range(pairs):
+                species.average_weight_difference(genome, other)
+
+        results.append({"genes": len(genome.genes),
+                        "excess_disjoint_per_second": pairs / best_time(excess_disjoint, repeat),
+                        "weight_difference_per_second": pairs / best_time(weight_difference, repeat)})
+
+    return results
+
+
+def bench_operators(genomes: List[Genome], history: InnovationHistory, seed: int, repeat: int,
+                    count: int=200) -> List[Dict[str, float]]:
+    """
+    Return how many microseconds Genome.crossover and Genome.fully_mutate take for each genome in <genomes>. Every
+    mutation is made on a fresh clone, and the clones are made before the timing starts.
+    """
+    results = []
+    for genome in genomes:
+        spouse = genome.clone()
+        spouse.fully_mutate(history, np.random.default_rng(seed))
+
+        def crossover() -> None:
+            for _ in range(count):
+                genome.crossover(spouse)
+
+        mutation_times = []
+        for attempt in range(repeat):
+            clones = [genome.clone() for _ in range(count)]
+            rng = np.random.default_rng(seed + attempt)
+            start = perf_counter()
+            for clone in clones:
+                clone.fully_mutate(history, rng)
+            mutation_times.append(perf_counter() - start)
+
+        results.append({"genes": len(genome.genes),
+                        "crossover_microseconds": best_time(crossover, repeat) / count * 1e6,
+                        "fully_mutate_microseconds": min(mutation_times) / count * 1e6})
+
+    return results
+
+
+def bench_generations(sizes: List[int], seed: int, generations: int=3, max_ticks: int=2000) -> List[Dict[str, float]]:
+    """
+    Return the wall time of a generation of a population of each size in <sizes>, evaluated serially with races of at
+    most <max_ticks> ticks, along with the time spent in each phase of the generations.
+    """
+    results = []
+    for size in sizes:
+        population = Population(size, SerialEvaluator(EvaluationBudget(max_ticks=max_ticks)), seed)
+        start = perf_counter()
+        population.run(generations)
+        elapsed = perf_counter() - start
+        population.close()
+
+        results.append({"population": size, "generations": generations,
+                        "seconds_per_generation": elapsed / generations,
+                        "phase_seconds": {phase: total / generations
+                                          for phase, total in population.total_timings.items()}})
+
+    return results
+
+
+def run_benchmarks(seed: int=0, repeat: int=3, sizes: Union[List[int], None]=None) -> Dict[str, object]:
+    """
+    Run every benchmark with the seed <seed>, taking the best of <repeat> runs of each, and return the results.
+    """
+    random.seed(seed)
+    history = InnovationHistory(1000)
+    genomes = [grown_genome(history, gene_count) for gene_count in genome_sizes]
+
+    return {
+        "seed": seed,
+        "repeat": repeat,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pygame": pygame.version.ver,
+        "race_step": bench_race_step(seed, repeat),
+        "neural_net_result": bench_neural_network(genomes, repeat),
+        "compatibility": bench_compatibility(genomes, history, repeat),
+        "operators": bench_operators(genomes, history, seed, repeat),
+        "generation": bench_generations(list(sizes or population_sizes), seed),
+    }
+
+
+def main() -> None:
+    """
+    Run the benchmarks and print their results as JSON, or write them to a file.
+    """
+    parser = argparse.ArgumentParser(description="Benchmark the race simulation and the NEAT hot paths.")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--population-sizes", type=int, nargs="+", default=list(population_sizes))
+    parser.add_argument("--output", help="the file to write the results to, instead of printing them")
+    args = parser.parse_args()
+
+    results = json.dumps(run_benchmarks(args.seed, args.repeat, args.population_sizes), indent=2)
+    if args.output is None:
+        print(results)
+    else:
+        with open(args.output, "w") as output:
+            output.write(results + "\n")
+
+
+if __name__ == "__main__":
+    main()
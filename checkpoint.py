@@ -0,0 +1,382 @@
+"""
+Saving training runs to binary checkpoints and resuming them
+"""
+from typing import List, NamedTuple, Sequence, Tuple, Union
+from threading import Thread
+import json
+import mmap
+import os
+import random
+import struct
+import numpy as np
+from CompactGenome import CompactGenome
+from ConnectionHistory import ConnectionHistory, InnovationHistory
+from Genome import Genome
+from Player import Player
+from Species import Species
+
+# magic, version, generation, population size, number of champions, number of best players, number of species,
+# best score, next innovation number, offset and number of entries of the innovation history, offset and size of the
+# random generator states
+HEADER = struct.Struct("<4sHIIIIIqQQQQQ")
+# genome offset and size, fitness, unadjusted fitness, score, best score, lifespan, race seed, whether or not the
+# race seed reproduces the race of the player, generation
+PLAYER = struct.Struct("<QQddqqqQ?I")
+# rep offset and size, best fitness, average fitness, staleness, champion (-1 if none), members offset and count
+SPECIES = struct.Struct("<QQddiiQI")
+# starting node, ending node, innovation number, number of innovation numbers of the genome it was made in
+CONNECTION = struct.Struct("<iiqI")
+# version and gauss_next (if there is one) of the state of the random module, followed by its 625 words
+RANDOM_STATE = struct.Struct("<I?d")
+MAGIC = b"MKCP"
+# version 2 checkpoints also keep the best players of the run, and players without a race seed
+VERSION = 2
+
+
+class PlayerRecord(NamedTuple):
+    """
+    Everything about a player that is saved in a checkpoint.
+    """
+    genome: CompactGenome
+    fitness: float
+    unadjusted_fitness: float
+    score: int
+    best_score: int
+    lifespan: int
+    race_seed: Union[int, None]
+    generation: int
+
+
+class SpeciesRecord(NamedTuple):
+    """
+    Everything about a species that is saved in a checkpoint. The champion is an index into the champions of the
+    checkpoint and the members are indices into its population.
+    """
+    rep: CompactGenome
+    best_fitness: float
+    average_fitness: float
+    staleness: int
+    champion: int
+    members: List[int]
+
+
+class CheckpointData(NamedTuple):
+    """
+    A snapshot of a training run that no longer refers to any of its players, species or genomes, so that it can be
+    written while the run goes on. The best players are the players that set a new best score, in the order they set
+    it.
+    """
+    generation: int
+    players: List[PlayerRecord]
+    champions: List[PlayerRecord]
+    best_players: List[PlayerRecord]
+    best_score: int
+    species: List[SpeciesRecord]
+    next_innovation_number: int
+    connections: List[Tuple[int, int, int, Tuple[int, ...]]]
+    random_state: tuple
+    numpy_state: Union[dict, None]
+
+
+def player_record(player: Player) -> PlayerRecord:
+    """
+    Return the record of <player>.
+    """
+    return PlayerRecord(player.brain.to_compact(), player.fitness, player.unadjusted_fitness, player.score,
+                        player.best_score, player.lifespan, player.race_seed, player.generation)
+
+
+def snapshot(generation: int, players: List[Player], species: List[Species], history: InnovationHistory,
+             rng: Union[np.random.Generator, None]=None, best_players: Sequence[Player]=(),
+             best_score: int=0) -> CheckpointData:
+    """
+    Return a snapshot of the training run at <generation>, with the population <players> divided into <species>, the
+    innovation history <history>, the states of the random module and of <rng>, and the players that set the best
+    scores of the run <best_players> up to <best_score>. Members of the species that are no longer in the
+    population, such as the parents of a generation that was just reproduced, are left out.
+    """
+    indices = {id(player): index for index, player in enumerate(players)}
+    champions, species_records = [], []
+    for one_species in species:
+        champion = getattr(one_species, "champion", None)
+        if champion is not None:
+            champions.append(player_record(champion))
+        species_records.append(SpeciesRecord(one_species.rep.to_compact(), one_species.best_fitness,
+                                             one_species.average_fitness, one_species.staleness,
+                                             len(champions) - 1 if champion is not None else -1,
+                                             [indices[id(player)] for player in one_species.players
+                                              if id(player) in indices]))
+
+    connections = [(connection.starting_node, connection.ending_node, connection.innovation_number,
+                    tuple(connection.innovation_numbers)) for connection in history.connections.values()]
+    return CheckpointData(generation, [player_record(player) for player in players], champions,
+                          [player_record(player) for player in best_players], best_score, species_records,
+                          history.next_innovation_number, connections, random.getstate(),
+                          rng.bit_generator.state if rng is not None else None)
+
+
+def encode(data: CheckpointData) -> bytes:
+    """
+    Return <data> in the binary checkpoint format.
+
+    The header and the fixed size entries of the players, the champions and the species come first. They point at
+    the variable sized sections that follow them, so that a single genome can be read without reading the others.
+    """
+    player_records = data.players + data.champions + data.best_players
+    directory_size = HEADER.size + PLAYER.size * len(player_records) + SPECIES.size * len(data.species)
+    sections = []
+    offset = directory_size
+
+    def add_section(section: bytes) -> int:
+        nonlocal offset
+        sections.append(section)
+        offset += len(section)
+        return offset - len(section)
+
+    entries = []
+    for record in player_records:
+        genome = record.genome.to_bytes()
+        entries.append(PLAYER.pack(add_section(genome), len(genome), record.fitness, record.unadjusted_fitness,
+                                   record.score, record.best_score, record.lifespan, record.race_seed or 0,
+                                   record.race_seed is not None, record.generation))
+
+    for record in data.species:
+        rep = record.rep.to_bytes()
+        rep_offset = add_section(rep)
+        members_offset = add_section(np.array(record.members, dtype="<u4").tobytes())
+        entries.append(SPECIES.pack(rep_offset, len(rep), record.best_fitness, record.average_fitness,
+                                    record.staleness, record.champion, members_offset, len(record.members)))
+
+    history = b"".join(CONNECTION.pack(start, end, innovation_number, len(numbers)) +
+                       np.array(numbers, dtype="<i8").tobytes()
+                       for start, end, innovation_number, numbers in data.connections)
+    history_offset = add_section(history)
+
+    version, words, gauss_next = data.random_state
+    rng_state = (RANDOM_STATE.pack(version, gauss_next is not None, gauss_next or 0.0) +
+                 np.array(words, dtype="<u4").tobytes() + json.dumps(data.numpy_state).encode())
+    rng_offset = add_section(rng_state)
+
+    header = HEADER.pack(MAGIC, VERSION, data.generation, len(data.players), len(data.champions),
+                         len(data.best_players), len(data.species), data.best_score, data.next_innovation_number,
+                         history_offset, len(data.connections), rng_offset, len(rng_state))
+    return b"".join([header] + entries + sections)
+
+
+def write_checkpoint(path: str, data: CheckpointData) -> None:
+    """
+    Write <data> to the file at <path>. The file is replaced in a single step, so a crash while writing leaves the
+    previous checkpoint intact.
+    """
+    temporary_path = path + ".tmp"
+    with open(temporary_path, "wb") as checkpoint_file:
+        checkpoint_file.write(encode(data))
+        checkpoint_file.flush()
+        os.fsync(checkpoint_file.fileno())
+    os.replace(temporary_path, path)
+
+
+def save_checkpoint(path: str, generation: int, players: List[Player], species: List[Species],
+                    history: InnovationHistory, rng: Union[np.random.Generator, None]=None,
+                    best_players: Sequence[Player]=(), best_score: int=0) -> None:
+    """
+    Save the training run at <generation> to the file at <path>.
+    """
+    write_checkpoint(path, snapshot(generation, players, species, history, rng, best_players, best_score))
+
+
+class Checkpoint:
+    """
+    A checkpoint file that is read through a memory map. Opening it only reads its header, and everything else is only
+    read when it is asked for, so a single champion can be extracted from the checkpoint of a large population
+    without reading the rest of it.
+    """
+    generation: int
+    population_size: int
+    champion_count: int
+    best_count: int
+    species_count: int
+    best_score: int
+    next_innovation_number: int
+
+    def __init__(self, path: str) -> None:
+        """
+        Opens the checkpoint saved in the file at <path>.
+        """
+        with open(path, "rb") as checkpoint_file:
+            self.map = mmap.mmap(checkpoint_file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, self.generation, self.population_size, self.champion_count, self.best_count, \
+            self.species_count, self.best_score, self.next_innovation_number, self.history_offset, \
+            self.history_count, self.rng_offset, self.rng_size = HEADER.unpack_from(self.map)
+        if magic != MAGIC or version != VERSION:
+            self.map.close()
+            raise ValueError("Not a version {} checkpoint".format(VERSION))
+
+        self.players_offset = HEADER.size
+        self.best_offset = self.population_size + self.champion_count
+        self.species_offset = self.players_offset + PLAYER.size * (self.best_offset + self.best_count)
+
+    def __enter__(self) -> "Checkpoint":
+        return self
+
+    def __exit__(self, *_) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Close the memory map of this checkpoint.
+        """
+        self.map.close()
+
+    def genome(self, offset: int, size: int) -> Genome:
+        """
+        Return the genome stored at <offset>.
+        """
+        with memoryview(self.map) as view:
+            return Genome.from_compact(CompactGenome.from_bytes(view[offset:offset + size]))
+
+    def player_entry(self, index: int) -> Tuple:
+        """
+        Return the entry of the player at <index>, where the champions come after the population, and the best
+        players after the champions.
+        """
+        return PLAYER.unpack_from(self.map, self.players_offset + PLAYER.size * index)
+
+    def player(self, index: int) -> Player:
+        """
+        Return the player at <index> in the population.
+        """
+        return self.make_player(self.player_entry(index))
+
+    def make_player(self, entry: Tuple) -> Player:
+        """
+        Return the player saved in the player entry <entry>.
+        """
+        offset, size, fitness, unadjusted_fitness, score, best_score, lifespan, race_seed, has_race_seed, \
+            generation = entry
+        player = Player()
+        player.brain = self.genome(offset, size)
+        player.fitness, player.unadjusted_fitness = fitness, unadjusted_fitness
+        player.score, player.best_score, player.lifespan = score, best_score, lifespan
+        player.race_seed = race_seed if has_race_seed else None
+        player.generation = generation
+        return player
+
+    def players(self) -> List[Player]:
+        """
+        Return the whole population.
+        """
+        return [self.player(index) for index in range(self.population_size)]
+
+    def best_players(self) -> List[Player]:
+        """
+        Return the players that set the best scores of the run, in the order they set them.
+        """
+        return [self.make_player(self.player_entry(self.best_offset + index)) for index in range(self.best_count)]
+
+    def champion(self) -> Player:
+        """
+        Return the fittest player that was saved, among the population, the champions of the species and the best
+        players, reading only the genome of that player.
+        """
+        entries = [self.player_entry(index) for index in range(self.best_offset + self.best_count)]
+        return self.make_player(max(entries, key=lambda entry: entry[2]))
+
+    def species(self, players: List[Player]) -> List[Species]:
+        """
+        Return the species, with their members taken from <players>, the population returned by players.
+        """
+        all_species = []
+        for index in range(self.species_count):
+            rep_offset, rep_size, best_fitness, average_fitness, staleness, champion, members_offset, member_count = \
+                SPECIES.unpack_from(self.map, self.species_offset + SPECIES.size * index)
+
+            species = Species()
+            species.rep = self.genome(rep_offset, rep_size)
+            species.best_fitness, species.average_fitness, species.staleness = \
+                best_fitness, average_fitness, staleness
+            if champion != -1:
+                species.champion = self.make_player(self.player_entry(self.population_size + champion))
+            members = np.frombuffer(self.map, dtype="<u4", count=member_count, offset=members_offset)
+            species.players = [players[member] for member in members.tolist()]
+            all_species.append(species)
+
+        return all_species
+
+    def history(self) -> InnovationHistory:
+        """
+        Return the innovation history.
+        """
+        history = InnovationHistory(self.next_innovation_number)
+        position = self.history_offset
+        for _ in range(self.history_count):
+            start, end, innovation_number, count = CONNECTION.unpack_from(self.map, position)
+            position += CONNECTION.size
+            numbers = frozenset(np.frombuffer(self.map, dtype="<i8", count=count, offset=position).tolist())
+            position += 8 * count
+            history.connections[(start, end, numbers)] = ConnectionHistory(start, end, innovation_number, numbers)
+
+        return history
+
+    def restore_random_state(self, rng: Union[np.random.Generator, None]=None) -> None:
+        """
+        Restore the state of the random module, and the state of <rng> if it is given, to their states when the
+        checkpoint was saved.
+        """
+        version, has_gauss_next, gauss_next = RANDOM_STATE.unpack_from(self.map, self.rng_offset)
+        words_offset = self.rng_offset + RANDOM_STATE.size
+        words = np.frombuffer(self.map, dtype="<u4", count=625, offset=words_offset).tolist()
+        random.setstate((version, tuple(words), gauss_next if has_gauss_next else None))
+
+        numpy_state = json.loads(bytes(self.map[words_offset + 4 * 625:self.rng_offset + self.rng_size]))
+        if rng is not None and numpy_state is not None:
+            rng.bit_generator.state = numpy_state
+
+
+class CheckpointWriter:
+    """
+    Saves checkpoints of a training run every few generations in a background thread, so that writing them does not
+    stall the generations. Only the snapshot of the run is taken in the generation loop, and at most one checkpoint is
+    being written at a time.
+    """
+    path: str
+    interval: int
+    thread: Union[Thread, None]
+
+    def __init__(self, path: str, interval: int=10) -> None:
+        """
+        Initializes a writer that saves a checkpoint to the file at <path> every <interval> generations.
+        """
+        self.path, self.interval = path, interval
+        self.thread = None
+
+    def save(self, generation: int, players: List[Player], species: List[Species], history: InnovationHistory,
+             rng: Union[np.random.Generator, None]=None, best_players: Sequence[Player]=(),
+             best_score: int=0) -> None:
+        """
+        Start saving the training run at <generation> in the background, once the previous checkpoint is written.
+        """
+        data = snapshot(generation, players, species, history, rng, best_players, best_score)
+        self.wait()
+        self.thread = Thread(target=write_checkpoint, args=(self.path, data), daemon=True)
+        self.thread.start()
+
+    def maybe_save(self, generation: int, players: List[Player], species: List[Species],
+                   history: InnovationHistory, rng: Union[np.random.Generator, None]=None,
+                   best_players: Sequence[Player]=(), best_score: int=0) -> bool:
+        """
+        Save the training run if a checkpoint is due at <generation>. Return whether or not a checkpoint was started.
+        """
+        if generation % self.interval != 0:
+            return False
+        self.save(generation, players, species, history, rng, best_players, best_score)
+        return True
+
+    def wait(self) -> None:
+        """
+        Wait until the checkpoint that is being written, if any, is written.
+        """
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
@@ -0,0 +1,363 @@
+"""
+Fitness evaluation of the players of a generation
+"""
+from typing import List, Tuple, Union
+from heapq import heappush, heappushpop
+from multiprocessing import Pool
+from time import monotonic
+import os
+import random
+import numpy as np
+from batch_simulation import BatchRaceSimulation
+from CompactGenome import CompactGenome
+from fitness_cache import FitnessCache, RaceResult
+from Genome import Genome
+from observation import BatchObservationBuilder
+import observation
+from Player import Player
+from PopulationPlan import PopulationPlan
+from simulation import RaceSimulation
+
+
+def race_seeds(seed: int, count: int, track_seed: Union[int, None]=None) -> List[int]:
+    """
+    Return the seeds of the <count> races of a generation that is evaluated with the seed <seed>. If <track_seed> is
+    given, every player races on the same road, generated from <track_seed>, in every generation instead.
+    """
+    if track_seed is not None:
+        return [track_seed] * count
+
+    rng = random.Random(seed)
+    return [rng.getrandbits(64) for _ in range(count)]
+
+
+class EvaluationBudget:
+    """
+    The limits on how long the races of a generation may take. A race ends early once it has lasted <max_ticks>
+    ticks, once Mario has not travelled any further for <stall_ticks> ticks, or once the generation has taken
+    <deadline> seconds. Any limit that is None does not apply.
+
+    With <top_k>, a race also ends early once the player could no longer reach the <top_k> best fitness of the
+    generation so far, even if it drove at full speed for the rest of its <max_ticks>. Players are only divided into
+    species after they are evaluated, so this is the top k of the whole generation rather than of a species.
+    """
+    max_ticks: Union[int, None]
+    stall_ticks: Union[int, None]
+    deadline: Union[float, None]
+    top_k: Union[int, None]
+
+    # no kart can travel further than this in a single tick
+    max_speed = 30
+
+    def __init__(self, max_ticks: Union[int, None]=20000, stall_ticks: Union[int, None]=300,
+                 deadline: Union[float, None]=None, top_k: Union[int, None]=None) -> None:
+        """
+        Initializes a budget with the given limits.
+        """
+        self.max_ticks, self.stall_ticks, self.deadline, self.top_k = max_ticks, stall_ticks, deadline, top_k
+
+    def deadline_at(self) -> Union[float, None]:
+        """
+        Return the time.monotonic() time at which a generation starting now has to stop, or None if there is no
+        deadline.
+        """
+        return monotonic() + self.deadline if self.deadline is not None else None
+
+    def config(self) -> Tuple[Union[int, None], Union[int, None]]:
+        """
+        Return the limits of this budget that a race always ends at the same tick for, whatever else is raced and
+        whenever it is raced.
+        """
+        return self.max_ticks, self.stall_ticks
+
+    def fitness_bound(self, travelled: float, ticks: int) -> float:
+        """
+        Return the highest fitness a player that has travelled <travelled> in <ticks> ticks could still reach.
+        """
+        if self.max_ticks is None:
+            return float("inf")
+        score = int(travelled + self.max_speed * (self.max_ticks - ticks))
+        return score * score
+
+    def exhausted(self, ticks: int, progress_tick: int) -> bool:
+        """
+        Return whether or not a race that has lasted <ticks> ticks, in which Mario last travelled further at
+        <progress_tick>, has reached the tick or the stall limit.
+        """
+        return ((self.max_ticks is not None and ticks >= self.max_ticks) or
+                (self.stall_ticks is not None and ticks - progress_tick >= self.stall_ticks))
+
+    def cut_short(self, ticks: int, travelled: float, deadline_at: Union[float, None], threshold: float) -> bool:
+        """
+        Return whether or not a race that has lasted <ticks> ticks, in which Mario has travelled <travelled>, has to
+        end because of the deadline <deadline_at> or because the player can no longer reach the fitness <threshold>.
+        """
+        return ((threshold > 0 and self.fitness_bound(travelled, ticks) < threshold) or
+                (deadline_at is not None and monotonic() >= deadline_at))
+
+
+def play_within_budget(player: Player, race: RaceSimulation, budget: EvaluationBudget,
+                       deadline_at: Union[float, None]=None, threshold: float=0) -> bool:
+    """
+    Let <player> race in <race> until Mario crashes or <budget> ends the race. Return False if the race was cut short
+    by the deadline or by <threshold>, so the same race could end differently another time, and True otherwise.
+    """
+    if deadline_at is not None and monotonic() >= deadline_at:
+        player.dead = True
+        return False
+
+    progress, progress_tick = race.background.travelled, 0
+    while not player.dead:
+        player.look(race)
+        player.update(race, player.think())
+
+        travelled = race.background.travelled
+        if travelled > progress:
+            progress, progress_tick = travelled, player.lifespan
+        if budget.exhausted(player.lifespan, progress_tick):
+            player.dead = True
+        elif budget.cut_short(player.lifespan, travelled, deadline_at, threshold):
+            player.dead = True
+            return False
+
+    return True
+
+
+def evaluate_player(player: Player, seed: int, budget: Union[EvaluationBudget, None]=None,
+                    deadline_at: Union[float, None]=None, threshold: float=0) -> Tuple[RaceResult, bool]:
+    """
+    Let <player> race on the road generated from <seed> until it crashes, or until <budget> ends the race if it is
+    given. Return its fitness, score and lifespan, and whether or not the same race would always give that result.
+    """
+    player.race_seed = seed
+    race = RaceSimulation(seed=seed)
+    reproducible = True
+    if budget is None:
+        player.play(race)
+    else:
+        reproducible = play_within_budget(player, race, budget, deadline_at, threshold)
+
+    player.calculate_fitness()
+    return (player.fitness, player.score, player.lifespan), reproducible
+
+
+def evaluate_compact(task: Tuple[CompactGenome, int, EvaluationBudget, Union[float, None]]) -> Tuple[RaceResult, bool]:
+    """
+    Evaluate the genome that was turned into a compact genome in a worker process. <task> holds the compact genome,
+    the seed of its race, the budget of the race and the deadline of the generation.
+    """
+    compact, seed, budget, deadline_at = task
+    player = Player()
+    player.brain = Genome.from_compact(compact)
+    return evaluate_player(player, seed, budget, deadline_at)
+
+
+def record_result(player: Player, result: RaceResult, seed: Union[int, None]) -> None:
+    """
+    Store the fitness, score and lifespan in <result> of the race generated from <seed> on <player>. <seed> is None if
+    no seed reproduces the race.
+    """
+    player.race_seed = seed
+    player.fitness, player.score, player.lifespan = result
+    player.unadjusted_fitness = player.fitness
+    player.dead = True
+    if player.score > player.best_score:
+        player.best_score = player.score
+
+
+def cache_key(player: Player, seed: int, budget: EvaluationBudget) -> Tuple[bytes, int, Tuple]:
+    """
+    Return the key of the result of <player> on the road generated from <seed> within <budget> in a FitnessCache.
+    """
+    return player.brain.content_hash(), seed, budget.config()
+
+
+class SerialEvaluator:
+    """
+    Evaluates the players of a generation one after the other in this process, within <budget> (an EvaluationBudget
+    with its default limits if none is given), and on the single road generated from <track_seed> if it is given.
+
+    With a FitnessCache <cache>, a player whose genome has already raced on the same road within the same limits gets
+    its earlier result instead of racing again. Only races that were not cut short by the deadline or the top k limit
+    are stored, since the others could end differently another time.
+    """
+    budget: EvaluationBudget
+    track_seed: Union[int, None]
+    cache: Union[FitnessCache, None]
+
+    def __init__(self, budget: Union[EvaluationBudget, None]=None, track_seed: Union[int, None]=None,
+                 cache: Union[FitnessCache, None]=None) -> None:
+        """
+        Initializes the evaluator.
+        """
+        self.budget = budget if budget is not None else EvaluationBudget()
+        self.track_seed, self.cache = track_seed, cache
+
+    def evaluate(self, players: List[Player], seed: int) -> None:
+        """
+        Evaluate the fitness of every player in <players>, with the races of the generation generated from <seed>.
+        """
+        deadline_at = self.budget.deadline_at()
+        top_k = self.budget.top_k
+        cache = self.cache
+        if cache is not None:
+            cache.new_generation()
+
+        # the <top_k> best fitness so far, the smallest first
+        best = []
+        for player, race_seed in zip(players, race_seeds(seed, len(players), self.track_seed)):
+            result = None
+            if cache is not None:
+                key = cache_key(player, race_seed, self.budget)
+                result = cache.get(key)
+            if result is not None:
+                record_result(player, result, race_seed)
+            else:
+                threshold = best[0] if top_k is not None and len(best) == top_k else 0
+                result, reproducible = evaluate_player(player, race_seed, self.budget, deadline_at, threshold)
+                if cache is not None and reproducible:
+                    cache.put(key, result)
+
+            fitness = result[0]
+            if top_k is not None:
+                if len(best) < top_k:
+                    heappush(best, fitness)
+                else:
+                    heappushpop(best, fitness)
+
+    def close(self) -> None:
+        """
+        Release the resources of this evaluator.
+        """
+
+
+class ParallelEvaluator:
+    """
+    Evaluates the players of a generation in a pool of worker processes, one per core by default, within <budget>.
+    The results are the same as those of a SerialEvaluator given the same seed, budget, <track_seed> and <cache>,
+    except that the workers never know the best fitness of the other players, so the top k limit of the budget does
+    not apply. The cache is looked up in this process, and only the players that miss it are sent to the workers.
+    """
+    processes: int
+    budget: EvaluationBudget
+    track_seed: Union[int, None]
+    cache: Union[FitnessCache, None]
+
+    def __init__(self, processes: Union[int, None]=None, budget: Union[EvaluationBudget, None]=None,
+                 track_seed: Union[int, None]=None, cache: Union[FitnessCache, None]=None) -> None:
+        """
+        Initializes the evaluator and starts its worker processes.
+        """
+        self.processes = processes if processes is not None else os.cpu_count() or 1
+        self.budget = budget if budget is not None else EvaluationBudget()
+        self.track_seed, self.cache = track_seed, cache
+        self.pool = Pool(self.processes)
+
+    def evaluate(self, players: List[Player], seed: int) -> None:
+        """
+        Evaluate the fitness of every player in <players>, with the races of the generation generated from <seed>.
+        """
+        deadline_at = self.budget.deadline_at()
+        cache = self.cache
+        if cache is not None:
+            cache.new_generation()
+
+        # the players that still have to race, with the keys of their results
+        racing, keys = [], []
+        for player, race_seed in zip(players, race_seeds(seed, len(players), self.track_seed)):
+            if cache is None:
+                racing.append((player, race_seed))
+                continue
+
+            key = cache_key(player, race_seed, self.budget)
+            result = cache.get(key)
+            if result is not None:
+                record_result(player, result, race_seed)
+            else:
+                racing.append((player, race_seed))
+                keys.append(key)
+
+        tasks = [(player.brain.to_compact(), race_seed, self.budget, deadline_at) for player, race_seed in racing]
+        chunksize = max(1, len(tasks) // (self.processes * 4))
+        results = self.pool.map(evaluate_compact, tasks, chunksize)
+
+        for (player, race_seed), (result, reproducible) in zip(racing, results):
+            record_result(player, result, race_seed)
+        if cache is not None:
+            for key, (result, reproducible) in zip(keys, results):
+                if reproducible:
+                    cache.put(key, result)
+
+    def close(self) -> None:
+        """
+        Stop the worker processes.
+        """
+        self.pool.close()
+        self.pool.join()
+
+
+class VectorizedEvaluator:
+    """
+    Evaluates the players of a generation all at once in this process: every player races in the same
+    BatchRaceSimulation, and all of their decisions of a tick are made by a single PopulationPlan.
+
+    The roads of a batch race are drawn with NumPy, so they are not the roads that a SerialEvaluator would race the
+    players on with the same seed. No seed reproduces the race of a kart, so the players are left without a race seed
+    and cannot be spectated or recorded, and their results are not memoized in a FitnessCache. The limits of <budget>
+    apply to every kart, and the top k limit compares each kart with the karts that are racing alongside it.
+    """
+    budget: EvaluationBudget
+
+    def __init__(self, budget: Union[EvaluationBudget, None]=None) -> None:
+        """
+        Initializes the evaluator.
+        """
+        self.budget = budget if budget is not None else EvaluationBudget()
+
+    def evaluate(self, players: List[Player], seed: int) -> None:
+        """
+        Evaluate the fitness of every player in <players>, with the races of the generation generated from <seed>.
+        """
+        race = BatchRaceSimulation(len(players), seed)
+        plan = PopulationPlan([player.brain for player in players])
+        lifespans = np.zeros(len(players), dtype=np.int64)
+        observer = BatchObservationBuilder(race)
+        vision = np.empty((len(players), observation.inputs))
+
+        budget, deadline_at = self.budget, self.budget.deadline_at()
+        progress, progress_tick = race.travelled.copy(), np.zeros(len(players), dtype=np.int64)
+
+        racing = ~race.crash
+        tick = 0
+        while racing.any():
+            actions = plan.evaluate(observer.observe(race, vision)) > 2
+            lifespans += racing
+            racing = race.step(actions)
+            tick += 1
+
+            improved = race.travelled > progress
+            progress[improved], progress_tick[improved] = race.travelled[improved], tick
+            stop = np.zeros(len(players), dtype=bool)
+            if budget.stall_ticks is not None:
+                stop |= tick - progress_tick >= budget.stall_ticks
+            if budget.top_k is not None and budget.max_ticks is not None and len(players) > budget.top_k:
+                # the fitness of a kart so far is a lower bound of its final fitness
+                scores = np.floor(race.travelled)
+                threshold = np.partition(scores * scores, -budget.top_k)[-budget.top_k]
+                bounds = np.floor(race.travelled + budget.max_speed * (budget.max_ticks - tick))
+                stop |= bounds * bounds < threshold
+            if (budget.max_ticks is not None and tick >= budget.max_ticks) or \
+                    (deadline_at is not None and monotonic() >= deadline_at):
+                stop[:] = True
+
+            race.crash |= stop
+            racing &= ~stop
+
+        for player, travelled, lifespan in zip(players, race.travelled.tolist(), lifespans.tolist()):
+            score = int(travelled)
+            record_result(player, (score * score, score, lifespan), None)
+
+    def close(self) -> None:
+        """
+        Release the resources of this evaluator.
+        """
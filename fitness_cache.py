@@ -0,0 +1,92 @@
+"""
+Memoized race results of the genomes that are evaluated more than once
+"""
+from typing import Hashable, Tuple, Union
+from collections import OrderedDict
+
+# the key of a race result: the content hash of the genome, the seed of the race and the evaluation config
+CacheKey = Tuple[bytes, int, Hashable]
+# the fitness, score and lifespan of a race
+RaceResult = Tuple[float, int, int]
+
+
+class FitnessCache:
+    """
+    The results of the most recent <capacity> races, keyed by the content hash of the genome that raced, the seed of
+    the road and the evaluation config that limited the race. Races are deterministic, so a genome that is raced on a
+    road it has already raced on under the same limits, such as the champion of a species or a plain clone, gets the
+    same result again without racing.
+
+    The lookups since the start of the current generation are counted in hits and misses, and all of the lookups in
+    total_hits and total_misses. saved_ticks and total_saved_ticks count the ticks of the races that were skipped.
+    """
+    capacity: int
+    results: "OrderedDict[CacheKey, RaceResult]"
+    hits: int
+    misses: int
+    saved_ticks: int
+    total_hits: int
+    total_misses: int
+    total_saved_ticks: int
+
+    def __init__(self, capacity: int=4096) -> None:
+        """
+        Initializes an empty cache of at most <capacity> results.
+        """
+        self.capacity = capacity
+        self.results = OrderedDict()
+        self.hits, self.misses, self.saved_ticks = 0, 0, 0
+        self.total_hits, self.total_misses, self.total_saved_ticks = 0, 0, 0
+
+    def __len__(self) -> int:
+        """
+        Return the number of results in this cache.
+        """
+        return len(self.results)
+
+    def new_generation(self) -> None:
+        """
+        Start counting the lookups of a new generation.
+        """
+        self.hits, self.misses, self.saved_ticks = 0, 0, 0
+
+    def get(self, key: CacheKey) -> Union[RaceResult, None]:
+        """
+        Return the result stored under <key>, or None if there is none.
+        """
+        result = self.results.get(key)
+        if result is None:
+            self.misses += 1
+            self.total_misses += 1
+            return None
+
+        # the result was just used, so it is the last to be evicted
+        self.results.move_to_end(key)
+        self.hits += 1
+        self.total_hits += 1
+        self.saved_ticks += result[2]
+        self.total_saved_ticks += result[2]
+        return result
+
+    def put(self, key: CacheKey, result: RaceResult) -> None:
+        """
+        Store <result> under <key>, evicting the least recently used result if this cache is full.
+        """
+        self.results[key] = result
+        self.results.move_to_end(key)
+        if len(self.results) > self.capacity:
+            self.results.popitem(last=False)
+
+    def hit_rate(self) -> float:
+        """
+        Return the fraction of the lookups of the current generation that were hits.
+        """
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups > 0 else 0.0
+
+    def total_hit_rate(self) -> float:
+        """
+        Return the fraction of all of the lookups that were hits.
+        """
+        lookups = self.total_hits + self.total_misses
+        return self.total_hits / lookups if lookups > 0 else 0.0
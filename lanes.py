@@ -0,0 +1,94 @@
+"""
+Lane index of the obstacles on the road
+"""
+from typing import Iterator, List, Union
+from bisect import bisect_left, bisect_right, insort
+import assets
+from obstacle import Obstacle, images
+
+
+def obstacle_y(obstacle: Obstacle) -> float:
+    """
+    Return how far down the road <obstacle> is.
+    """
+    return obstacle.y
+
+
+class LaneIndex:
+    """
+    The obstacles of a race grouped into lanes by their x coordinate, with every lane sorted from the top of the road
+    down. All of the obstacles move at the same speed, so moving them never changes the order of a lane.
+
+    Queries only look at the lanes an area can reach horizontally, and within those lanes only at the obstacles that
+    can reach it vertically, so their cost does not grow with the number of lanes and rows on the road. The lanes are
+    bisected on the y coordinates of the obstacles themselves, since every obstacle moves its own y coordinate, which
+    needs the key functions of bisect and insort from Python 3.10.
+    """
+    lane_x: List[int]
+    lanes: List[List[Obstacle]]
+    max_width: int
+    max_height: int
+    min_height: int
+
+    def __init__(self, lane_x: List[int]) -> None:
+        """
+        Initializes an empty index of the lanes at the x coordinates <lane_x>.
+        """
+        self.lane_x = sorted(lane_x)
+        self.lane_numbers = {x: number for number, x in enumerate(self.lane_x)}
+        self.lanes = [[] for _ in self.lane_x]
+
+        sizes = [assets.image_size(image) for image in images]
+        self.max_width = max(size[0] for size in sizes)
+        self.max_height = max(size[1] for size in sizes)
+        self.min_height = min(size[1] for size in sizes)
+
+    def __len__(self) -> int:
+        return sum(len(lane) for lane in self.lanes)
+
+    def add(self, obstacle: Obstacle) -> None:
+        """
+        Add <obstacle> to its lane.
+        """
+        insort(self.lanes[self.lane_numbers[obstacle.x]], obstacle, key=obstacle_y)
+
+    def remove_passed(self, y_limit: float) -> List[Obstacle]:
+        """
+        Remove and return the obstacles that are further down the road than <y_limit>.
+        """
+        removed = []
+        for lane in self.lanes:
+            while lane and lane[-1].y > y_limit:
+                removed.append(lane.pop())
+        return removed
+
+    def near(self, x_left: float, x_right: float, y_top: float, y_bottom: float) -> Iterator[Obstacle]:
+        """
+        Yield every obstacle whose sprite could overlap the area from (<x_left>, <y_top>) to (<x_right>, <y_bottom>).
+        """
+        first = bisect_left(self.lane_x, x_left - self.max_width)
+        last = bisect_right(self.lane_x, x_right)
+        for lane in self.lanes[first:last]:
+            top = bisect_left(lane, y_top - self.max_height, key=obstacle_y)
+            bottom = bisect_right(lane, y_bottom, key=obstacle_y)
+            yield from lane[top:bottom]
+
+    def closest_in_lane(self, lane_number: int, y_limit: float) -> Union[Obstacle, None]:
+        """
+        Return the obstacle in the lane <lane_number> whose bottom edge is the furthest down the road without being
+        further down than <y_limit>, or None if there is no such obstacle.
+        """
+        lane = self.lanes[lane_number]
+        closest, closest_end = None, None
+
+        # obstacles further down than this end below <y_limit> whatever their sprite is
+        index = bisect_right(lane, y_limit - self.min_height, key=obstacle_y)
+        while index > 0:
+            index -= 1
+            obstacle = lane[index]
+            if closest is not None and obstacle.y + self.max_height <= closest_end:
+                break
+            y_end = obstacle.y + obstacle.size[1]
+            if y_end <= y_limit and (closest is None or y_end > closest_end):
+                closest, closest_end = obstacle, y_end
+        return closest
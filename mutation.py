@@ -0,0 +1,80 @@
+"""
+Weight mutation of many genes at once with NumPy
+"""
+from typing import List, Union
+from random import getrandbits
+import numpy as np
+from ConnectionHistory import InnovationHistory
+
+# the chance that a weight is replaced by a new random weight instead of being perturbed
+reset_chance = 0.1
+# the chance that the weights of a genome are mutated when it is fully mutated
+weight_mutation_chance = 0.8
+
+# the generator of the mutations that are not given one, seeded from the random module when it is first needed
+shared_generator: Union[np.random.Generator, None] = None
+
+
+def default_generator() -> np.random.Generator:
+    """
+    Return the generator shared by the mutations that are not given one. Building a generator costs more than
+    mutating a small genome, so it is only built once per process.
+    """
+    global shared_generator
+    if shared_generator is None:
+        shared_generator = np.random.default_rng(getrandbits(64))
+
+    return shared_generator
+
+
+def mutate_weights(weights: np.ndarray, rng: np.random.Generator) -> np.ndarray:
+    """
+    Return <weights> mutated the same way as Gene.mutate_weight mutates a single weight: each weight has a 10% chance
+    of being replaced by a new random weight, and is otherwise perturbed slightly and clamped to [-1, 1]. Each
+    distribution is drawn from <rng> once for all of the weights.
+    """
+    count = len(weights)
+    reset = rng.random(count) < reset_chance
+    perturbed = np.clip(weights + rng.normal(0, 1, count) / 50, -1, 1)
+    return np.where(reset, rng.uniform(-1, 1, count), perturbed)
+
+
+def mutate_genome_weights(genomes: List["Genome"], rng: np.random.Generator) -> None:
+    """
+    Mutate the weights of every gene of every genome in <genomes> with a single draw from <rng> per distribution, by
+    concatenating all of their weights into one array.
+    """
+    genes = [gene for genome in genomes for gene in genome.genes]
+    if len(genes) == 0:
+        return
+
+    weights = mutate_weights(np.fromiter((gene.weight for gene in genes), float, len(genes)), rng)
+    for gene, weight in zip(genes, weights.tolist()):
+        gene.weight = weight
+
+    for genome in genomes:
+        genome.plan = None
+
+
+def mutate_generation(genomes: List["Genome"], history: InnovationHistory, rng: np.random.Generator) -> None:
+    """
+    Fully mutate every genome in <genomes> with the same chances as Genome.fully_mutate, but with the weights of all
+    of the genomes whose weights are mutated perturbed together. The rolls of whether each genome is mutated are drawn
+    from <rng>, but new connections and nodes still pick their nodes with the random module, like they always do.
+    """
+    for genome in genomes:
+        # if there is no gene connection, add one
+        if len(genome.genes) == 0:
+            genome.add_connection(history)
+
+    rolls = rng.random((len(genomes), 3))
+    mutate_genome_weights([genome for genome, roll in zip(genomes, rolls) if roll[0] < weight_mutation_chance], rng)
+
+    for genome, roll in zip(genomes, rolls):
+        # 8% chance of adding a random new connection
+        if roll[1] < 0.08:
+            genome.add_connection(history)
+
+        # 2% chance of adding a node
+        if roll[2] < 0.02:
+            genome.mutate_by_node_addition(history)
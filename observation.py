@@ -0,0 +1,129 @@
+"""
+What the players see of the road, as fixed length arrays of inputs for their neural networks
+"""
+import numpy as np
+from batch_simulation import BatchRaceSimulation
+from simulation import RaceSimulation
+
+# the inputs about Mario himself: how far he is from each edge of the road, his speeds and his accelerations
+kart_inputs = 6
+# the inputs about each lane: how far the left and the right of its closest obstacle ahead of Mario are from him
+# horizontally, and how far its bottom is from him vertically
+lane_inputs = 3
+lane_count = len(BatchRaceSimulation.eligible_x)
+inputs = kart_inputs + lane_inputs * lane_count
+
+road_width = RaceSimulation.right_bound - RaceSimulation.left_bound
+
+
+class ObservationBuilder:
+    """
+    Writes what a single kart of a RaceSimulation sees into an array of <inputs> values. Every input is scaled to
+    roughly [-1, 1], and a lane without any obstacle ahead of Mario reads as 1 for each of its inputs.
+    """
+
+    def observe(self, race: RaceSimulation, out: np.ndarray) -> np.ndarray:
+        """
+        Write what Mario sees in <race> into <out>, and return <out>.
+        """
+        mario = race.mario
+        out[0] = (mario.x_cor - race.left_bound) / road_width
+        out[1] = (race.right_bound - mario.x_cor) / road_width
+        out[2] = mario.speed / 15
+        out[3] = mario.hor_speed / 7
+        out[4] = mario.acceleration / 15
+        out[5] = mario.hor_acceleration
+
+        # the closest obstacle in each lane that is not yet behind Mario
+        y_limit = mario.y_cor + mario.size[1]
+        for lane_number in range(lane_count):
+            position = kart_inputs + lane_inputs * lane_number
+            obstacle = race.lanes.closest_in_lane(lane_number, y_limit)
+            if obstacle is None:
+                out[position:position + lane_inputs] = 1
+            else:
+                out[position] = (obstacle.x - mario.x_cor) / road_width
+                out[position + 1] = (obstacle.x + obstacle.size[0] - mario.x_cor) / road_width
+                out[position + 2] = (mario.y_cor - obstacle.y - obstacle.size[1]) / race.screen_height
+
+        return out
+
+
+class BatchObservationBuilder:
+    """
+    Writes what every kart of a BatchRaceSimulation sees, the same way as an ObservationBuilder, into an array of
+    shape (karts, <inputs>). All of the intermediate arrays are allocated once, so observing does not allocate any
+    arrays on every tick.
+    """
+    y_end: np.ndarray
+    ahead: np.ndarray
+    in_lane: np.ndarray
+    masked: np.ndarray
+    closest: np.ndarray
+    seen: np.ndarray
+    unseen: np.ndarray
+    gathered: np.ndarray
+    row_offsets: np.ndarray
+
+    def __init__(self, race: BatchRaceSimulation) -> None:
+        """
+        Initializes the intermediate arrays for observing <race>.
+        """
+        shape = race.obstacle_y.shape
+        self.y_end, self.masked = np.empty(shape), np.empty(shape)
+        self.ahead, self.in_lane = np.empty(shape, dtype=bool), np.empty(shape, dtype=bool)
+        self.closest = np.empty(race.size, dtype=np.intp)
+        self.seen, self.unseen = np.empty(race.size, dtype=bool), np.empty(race.size, dtype=bool)
+        self.gathered = np.empty(race.size)
+
+        # the position of the first slot of each kart in the flattened obstacle arrays
+        self.row_offsets = np.arange(race.size, dtype=np.intp) * shape[1]
+
+    def gather(self, values: np.ndarray) -> np.ndarray:
+        """
+        Return the value in <values> of the closest obstacle of each kart.
+        """
+        return np.take(values.reshape(-1), self.closest, out=self.gathered)
+
+    def observe(self, race: BatchRaceSimulation, out: np.ndarray) -> np.ndarray:
+        """
+        Write what every kart sees in <race> into <out>, and return <out>.
+        """
+        np.subtract(race.x_cor, RaceSimulation.left_bound, out=out[:, 0])
+        np.subtract(RaceSimulation.right_bound, race.x_cor, out=out[:, 1])
+        out[:, :2] /= road_width
+        np.divide(race.speed, 15, out=out[:, 2])
+        np.divide(race.hor_speed, 7, out=out[:, 3])
+        np.divide(race.acceleration, 15, out=out[:, 4])
+        out[:, 5] = race.hor_acceleration
+
+        # the obstacles that are not yet behind Mario
+        np.add(race.obstacle_y, race.obstacle_height, out=self.y_end)
+        np.less_equal(self.y_end, race.mario_y + race.mario_height, out=self.ahead)
+        self.ahead &= race.obstacle_alive
+
+        position = kart_inputs
+        for lane_number in range(lane_count):
+            # the closest of those obstacles in this lane
+            np.equal(race.obstacle_lane, lane_number, out=self.in_lane)
+            self.in_lane &= self.ahead
+            self.masked.fill(-np.inf)
+            np.copyto(self.masked, self.y_end, where=self.in_lane)
+            np.argmax(self.masked, axis=1, out=self.closest)
+            np.any(self.in_lane, axis=1, out=self.seen)
+            np.logical_not(self.seen, out=self.unseen)
+            self.closest += self.row_offsets
+
+            left, right, bottom = out[:, position], out[:, position + 1], out[:, position + 2]
+            np.subtract(self.gather(race.obstacle_x), race.x_cor, out=left)
+            np.add(left, self.gather(race.obstacle_width), out=right)
+            left /= road_width
+            right /= road_width
+            np.subtract(race.mario_y, self.gather(self.y_end), out=bottom)
+            bottom /= RaceSimulation.screen_height
+            for column in (left, right, bottom):
+                np.copyto(column, 1, where=self.unseen)
+
+            position += lane_inputs
+
+        return out
@@ -2,7 +2,8 @@
 Obstacle class for racing game
 """
 from random import choice
-import pygame
+from typing import List
+import assets
 
 bowser = "./bowser.png"
 donkeykong = "./donkeykong.png"
@@ -19,15 +20,28 @@ class Obstacle:
     An obstacle on the road!
     """
 
-    def __init__(self, x, y):
+    def __init__(self, x, y, headless=False, rng=None, image_path=None):
         """
-        Initiates an obstacle
+        Initiates an obstacle with the sprite <image_path>, or with its sprite chosen by <rng> if it is given. A
+        <headless> obstacle only knows the size of its sprite, and its collision mask, for which the sprite is decoded
+        once per process.
         """
-        self.image = pygame.image.load(choice(images))
+        if image_path is None:
+            image_path = choice(images) if rng is None else rng.choice(images)
+        self.headless = headless
+        self.reset(x, y, image_path)
+
+    def reset(self, x, y, image_path):
+        """
+        Turn this obstacle into a new obstacle at (x, y) with the sprite <image_path>.
+        """
+        self.image_path = image_path
+        self.image = None if self.headless else assets.load_image(image_path)
         self.x, self.y = x, y
         self.passed = False
         self.speed = 0
-        self.size = self.image.get_rect().size
+        self.size = assets.image_size(image_path)
+        self.mask = assets.load_mask(image_path)
         self.created_new = False
 
     def pass_obstacle(self):
@@ -41,3 +55,37 @@ class Obstacle:
         Move the obstacle vertically.
         """
         self.y += self.speed
+
+
+class ObstaclePool:
+    """
+    Obstacles that have scrolled off the road, kept to be recycled as new obstacles instead of allocating new ones.
+    """
+    free: List[Obstacle]
+    headless: bool
+    allocated: int
+
+    def __init__(self, capacity, headless=False):
+        """
+        Initiates a pool that starts out with <capacity> free obstacles.
+        """
+        self.headless = headless
+        self.free = [Obstacle(0, 0, headless, image_path=images[0]) for _ in range(capacity)]
+        self.allocated = capacity
+
+    def acquire(self, x, y, image_path):
+        """
+        Return an obstacle at (x, y) with the sprite <image_path>, recycled from the pool if one is free.
+        """
+        if not self.free:
+            self.allocated += 1
+            return Obstacle(x, y, self.headless, image_path=image_path)
+        obstacle = self.free.pop()
+        obstacle.reset(x, y, image_path)
+        return obstacle
+
+    def release(self, obstacle):
+        """
+        Give <obstacle> back to the pool once it is off the road.
+        """
+        self.free.append(obstacle)
@@ -0,0 +1,71 @@
+"""
+Renderer that draws a race onto the display
+"""
+from typing import List, Union
+import pygame
+import assets
+from mario import Mario
+from simulation import FrameSnapshot, RaceSimulation
+
+
+class Renderer:
+    """
+    Draws the background, the obstacles and Mario of a race once per frame from a snapshot of the race, and only
+    presents the parts of the display that changed since the previous frame with a single display update.
+    """
+    display: pygame.Surface
+    dirty_rects: List[pygame.Rect]
+    sprite_rects: List[pygame.Rect]
+    background_position: Union[tuple, None]
+
+    def __init__(self, display: pygame.Surface) -> None:
+        """
+        Initializes a renderer that draws onto <display>.
+        """
+        self.display = display
+        self.dirty_rects = []
+        self.sprite_rects = []
+        self.background_position = None
+
+    def draw(self, snapshot: FrameSnapshot) -> None:
+        """
+        Draw the frame in <snapshot> and present it.
+        """
+        background = assets.load_image(RaceSimulation.background_path)
+        position = (snapshot.background_x, snapshot.background_y)
+        scrolled = position != self.background_position
+
+        if scrolled:
+            # the background scrolled, so the whole display changes
+            self.display.blit(background, position)
+            self.background_position = position
+        else:
+            # paint the background back over where the sprites were last frame
+            for rect in self.sprite_rects:
+                self.display.blit(background, rect, rect.move(-position[0], -position[1]))
+
+        previous_rects = self.sprite_rects
+        self.sprite_rects = []
+        for x, y, image_path in snapshot.obstacles:
+            self.blit(assets.load_image(image_path), x, y)
+        self.blit(assets.load_image(Mario.image_path), snapshot.mario_x, snapshot.mario_y)
+
+        self.dirty_rects = [self.display.get_rect()] if scrolled else previous_rects + self.sprite_rects
+        pygame.display.update(self.dirty_rects)
+
+    def blit(self, image: pygame.Surface, x: float, y: float) -> None:
+        """
+        Draw the sprite <image> at (<x>, <y>), and remember where it was drawn if it is on the display.
+        """
+        rect = self.display.blit(image, (x, y))
+        if rect.width != 0 and rect.height != 0:
+            self.sprite_rects.append(rect)
+
+    def draw_banner(self, text: str) -> None:
+        """
+        Draw a banner with <text> across the display and present it.
+        """
+        banner = pygame.draw.rect(self.display, (255, 0, 0), (0, 150, 800, 200))
+        self.display.blit(pygame.font.SysFont("Arial", 80).render(text, True, (0, 0, 0)), (50, 200))
+        pygame.display.update([banner])
+        self.background_position = None
@@ -0,0 +1,171 @@
+"""
+Recording races and simulating them again
+"""
+from typing import List, Sequence, Tuple, Union
+import struct
+import pygame
+from Player import Player
+from renderer import Renderer
+from simulation import RaceSimulation
+
+# magic, version, seed, ticks, number of spawns
+HEADER = struct.Struct("<4sHQII")
+# tick, x, y, sprite
+SPAWN = struct.Struct("<Iiib")
+MAGIC = b"MKRP"
+# version 2 replays were recorded with pixel accurate collisions
+VERSION = 2
+
+
+class Replay:
+    """
+    A recorded race: the seed of its road, the commands given on every tick and the obstacles that were generated.
+
+    The commands of a tick are packed into 4 bits (accelerating, decelerating, hor_accelerating, hor_decelerating from
+    the lowest bit), so two ticks fit into a byte.
+    """
+    seed: int
+    ticks: int
+    actions: bytearray
+    spawns: List[Tuple[int, int, int, int]]
+
+    def __init__(self, seed: int) -> None:
+        """
+        Initializes an empty recording of the race generated from <seed>.
+        """
+        self.seed = seed
+        self.ticks = 0
+        self.actions = bytearray()
+        self.spawns = []
+
+    def add_actions(self, actions: Sequence[bool]) -> None:
+        """
+        Record the commands <actions> of the next tick.
+        """
+        bits = 0
+        for index, action in enumerate(actions):
+            if action:
+                bits |= 1 << index
+
+        if self.ticks % 2 == 0:
+            self.actions.append(bits)
+        else:
+            self.actions[-1] |= bits << 4
+        self.ticks += 1
+
+    def get_actions(self, tick: int) -> Tuple[bool, bool, bool, bool]:
+        """
+        Return the commands that were given on <tick>.
+        """
+        bits = self.actions[tick // 2] >> (4 * (tick % 2))
+        return bool(bits & 1), bool(bits & 2), bool(bits & 4), bool(bits & 8)
+
+    def to_bytes(self) -> bytes:
+        """
+        Return this replay in its binary format.
+        """
+        spawns = b"".join(SPAWN.pack(*spawn) for spawn in self.spawns)
+        return HEADER.pack(MAGIC, VERSION, self.seed, self.ticks, len(self.spawns)) + bytes(self.actions) + spawns
+
+    @staticmethod
+    def from_bytes(data: bytes) -> "Replay":
+        """
+        Return the replay stored in <data> by to_bytes.
+        """
+        magic, version, seed, ticks, spawn_count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("Not a version {} replay".format(VERSION))
+
+        replay = Replay(seed)
+        replay.ticks = ticks
+        start = HEADER.size
+        end = start + (ticks + 1) // 2
+        replay.actions = bytearray(data[start:end])
+        replay.spawns = [SPAWN.unpack_from(data, end + index * SPAWN.size) for index in range(spawn_count)]
+        return replay
+
+    def save(self, path: str) -> None:
+        """
+        Save this replay to the file at <path>.
+        """
+        with open(path, "wb") as replay_file:
+            replay_file.write(self.to_bytes())
+
+    @staticmethod
+    def load(path: str) -> "Replay":
+        """
+        Return the replay saved in the file at <path>.
+        """
+        with open(path, "rb") as replay_file:
+            return Replay.from_bytes(replay_file.read())
+
+
+def record_race(player: Player, seed: Union[int, None]) -> Replay:
+    """
+    Let <player> race on the road generated from <seed> until it crashes, and return the recording of the race. Raise
+    a ValueError if <seed> is None, such as the race seed of a player that a VectorizedEvaluator evaluated.
+    """
+    if seed is None:
+        raise ValueError("A race can only be recorded on a seeded road")
+
+    race = RaceSimulation(seed=seed)
+    replay = Replay(seed)
+    while not player.dead:
+        player.look(race)
+        actions = player.think()
+        replay.add_actions(actions)
+        player.update(race, actions)
+
+    replay.spawns = race.spawns[:]
+    return replay
+
+
+def simulate_replay(replay: Replay, headless: bool=True) -> RaceSimulation:
+    """
+    Simulate the race recorded in <replay> again as fast as possible, and return the race once all of its recorded
+    ticks have been simulated.
+    """
+    race = RaceSimulation(headless, replay.seed)
+    for tick in range(replay.ticks):
+        race.step(replay.get_actions(tick))
+
+    return race
+
+
+def verify_replay(replay: Replay) -> bool:
+    """
+    Return whether or not simulating <replay> again generates exactly the obstacles that were recorded, and ends in a
+    crash on its last tick.
+    """
+    race = simulate_replay(replay)
+    return [tuple(spawn) for spawn in race.spawns] == [tuple(spawn) for spawn in replay.spawns] and race.crash
+
+
+def watch_replay(replay: Replay, fps: int=150) -> None:
+    """
+    Show the race recorded in <replay> at display speed.
+    """
+    pygame.init()
+    display = pygame.display.set_mode((550, 750))
+    pygame.display.set_caption("2D Mario Kart! (replay)")
+    renderer = Renderer(display)
+    clock = pygame.time.Clock()
+
+    race = RaceSimulation(False, replay.seed)
+    renderer.draw(race.snapshot())
+
+    tick = 0
+    running = True
+    while running:
+        for event in pygame.event.get():
+            if event.type == pygame.QUIT:
+                running = False
+
+        if tick < replay.ticks:
+            race.step(replay.get_actions(tick))
+            renderer.draw(race.snapshot())
+            tick += 1
+            if tick == replay.ticks and race.crash:
+                renderer.draw_banner("Game Over!")
+
+        clock.tick(fps)
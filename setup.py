@@ -11,7 +11,9 @@ executables = [cx_Freeze.Executable("gameclass.py")]
 
 cx_Freeze.setup(
     name="2D Mario Kart",
-    options={"build_exe": {"packages":["pygame"],
+    # the lane index bisects its lanes with key functions, which needs Python 3.10
+    python_requires=">=3.10",
+    options={"build_exe": {"packages":["pygame", "numpy"],
                            "include_files":["bowser.png", "donkeykong.png", "toad.png", "toadette.png", "yoshi.png", "waluigi.png"]}},
     executables = executables
 
@@ -0,0 +1,369 @@
+"""
+Headless simulation of a race
+"""
+from typing import Dict, Iterator, NamedTuple, Tuple, List, Sequence, Union
+from functools import lru_cache
+from random import Random, choice, getrandbits
+from mario import Mario
+from background import Background
+from lanes import LaneIndex
+from obstacle import Obstacle, ObstaclePool, images
+
+
+def collision_between(mario: Mario, obstacle: Obstacle) -> bool:
+    """
+    Return whether or not there is overlapping between Mario and the obstacle.
+
+    The bounding boxes of the sprites are compared first, and only when they overlap are the collision masks of the
+    sprites compared, at the pixels the sprites are drawn at, so the transparent margins of the sprites never collide.
+    """
+    obs_span = (obstacle.x, obstacle.x + obstacle.size[0], obstacle.y, obstacle.y + obstacle.size[1])
+    mario_span = (mario.x_cor, mario.x_cor + mario.size[0], mario.y_cor, mario.y_cor + mario.size[1])
+
+    check_x_ok = obs_span[1] < mario_span[0] or obs_span[0] > mario_span[1]
+    check_y_ok = obs_span[3] < mario_span[2] or obs_span[2] > mario_span[3]
+    if check_x_ok or check_y_ok:
+        return False
+
+    offset = (int(obstacle.x) - int(mario.x_cor), int(obstacle.y) - int(mario.y_cor))
+    return mario.mask.overlap(obstacle.mask, offset) is not None
+
+
+def generate_obstacle(x, y, headless: bool=False, rng: Union[Random, None]=None) -> Obstacle:
+    """
+    Generate an obstacle, with its sprite chosen by <rng> if it is given.
+    """
+    new_obstacle = Obstacle(x, y, headless, rng)
+    return new_obstacle
+
+
+def accelerating_true(character: Mario, background: Background):
+    """
+    Changes Mario's position, speed and acceleration when accelerating is true.
+    """
+    if character.acceleration < 0:
+        character.acceleration = 0
+    elif 0 <= character.acceleration < 15:
+        character.acceleration += 0.05
+    if character.acceleration >= 0 and character.speed < 15:
+        character.speed += character.acceleration
+
+    background.speed = character.speed
+
+    background.move_background(background.x_cor, background.y_cor + background.speed)
+
+
+def decelerating_true(character: Mario, background: Background):
+    """
+    Changes Mario's position, speed and acceleration when accelerating is true.
+    """
+    if character.acceleration > 0:
+        character.acceleration = 0
+    elif 0 >= character.acceleration > -15:
+        character.acceleration -= 0.08
+
+    if character.acceleration < 0 and character.speed > -15:
+        character.speed += character.acceleration
+    background.speed = character.speed
+
+    background.move_background(background.x_cor, background.y_cor + background.speed)
+
+
+def hor_accelerating_true(character: Mario):
+    """
+    Changes Mario's position, speed and acceleration when accelerating is true.
+    """
+    if 0 <= character.hor_acceleration < 1:
+        character.hor_acceleration += 0.1
+    elif character.hor_acceleration < 0:
+        character.hor_acceleration = 0.1
+    if character.hor_acceleration >= 0 and character.hor_speed < 7:
+        character.hor_speed += character.hor_acceleration
+
+    character.move_mario(character.x_cor + character.hor_speed, character.y_cor)
+
+
+def hor_decelerating_true(character: Mario):
+    """
+    Changes Mario's position, speed and acceleration when accelerating is true.
+    """
+    if 0 >= character.hor_acceleration > -1:
+        character.hor_acceleration -= 0.1
+    elif character.hor_acceleration > 0:
+        character.hor_acceleration = -0.1
+
+    if character.hor_acceleration < 0 and character.hor_speed > -7:
+        character.hor_speed += character.hor_acceleration
+    character.move_mario(character.x_cor + character.hor_speed, character.y_cor)
+
+
+def no_vert_command(character, background):
+    """
+    Adjust the acceleration, speed and location the character and the background when no key is pressed.
+    """
+    change = 0.5
+    # slowly bring the speed down or up to 0
+    if character.speed >= 0.5 or character.speed <= -0.5:
+        character.speed *= 0.5
+    else:
+        character.speed = 0
+
+    # set background speed to character speed
+    background.speed = character.speed
+    # character.move_mario(character.x_cor, character.y_cor + character.speed)
+    background.move_background(background.x_cor, background.y_cor + background.speed)
+
+
+def no_hor_command(character, background):
+    """
+    Adjust the acceleration, speed and location the character and the background when no key is pressed.
+    """
+    change = 0.0
+    if character.hor_speed >= 0.3 or character.hor_speed <= -0.3:
+        character.hor_speed *= 0.5
+    else:
+        character.hor_speed = 0
+    character.move_mario(character.x_cor + character.hor_speed, character.y_cor)
+
+
+def choose_obstacle_coordinates(curr_ok_x: List[int], curr_ok_y: List[int],
+                                rng: Union[Random, None]=None) -> Tuple[int, int]:
+    """
+    Generate obstacle coordinates, chosen by <rng> if it is given.
+    """
+    pick = choice if rng is None else rng.choice
+    x, y = pick(curr_ok_x), pick(curr_ok_y)
+    curr_ok_y.remove(y)
+    curr_ok_x.remove(x)
+    curr_ok_x.extend(curr_ok_x)
+    curr_ok_x.append(x)
+    return (x, y)
+
+
+@lru_cache(maxsize=None)
+def coordinate_tables(eligible_x: Tuple[int, ...],
+                      eligible_y: Tuple[int, ...]) -> Tuple[Dict[tuple, tuple], Dict[tuple, tuple]]:
+    """
+    Return the lists that choose_obstacle_coordinates picks the x and the y coordinates of an obstacle from, for every
+    set of coordinates that can already have been chosen for the row. The tables are only built once for each set of
+    eligible coordinates.
+    """
+    x_table, y_table = {}, {}
+
+    def expand(chosen_x: tuple, chosen_y: tuple, curr_ok_x: List[int], curr_ok_y: List[int]) -> None:
+        x_table[chosen_x], y_table[chosen_y] = tuple(curr_ok_x), tuple(curr_ok_y)
+        if len(curr_ok_y) == 1:
+            return
+        for x in set(curr_ok_x):
+            for y in curr_ok_y:
+                next_ok_x = curr_ok_x[:]
+                next_ok_x.remove(x)
+                next_ok_x.extend(next_ok_x)
+                next_ok_x.append(x)
+                next_ok_y = [other_y for other_y in curr_ok_y if other_y != y]
+                expand(chosen_x + (x,), chosen_y + (y,), next_ok_x, next_ok_y)
+
+    expand((), (), list(eligible_x), list(eligible_y))
+    return x_table, y_table
+
+
+def obstacle_rows(rng: Random, eligible_x: List[int], eligible_y: List[int]) -> Iterator[Tuple[int, ...]]:
+    """
+    Yield the rows of obstacles of a road one at a time, forever, with their coordinates and sprites chosen by <rng>.
+    A row is flattened into (x, y, sprite) for each of its obstacles, where sprite is an index into the obstacle images.
+
+    This makes exactly the same choices with <rng> as generating the obstacles with choose_obstacle_coordinates and
+    generate_obstacle does, but from coordinate tables that are built once.
+    """
+    x_table, y_table = coordinate_tables(tuple(eligible_x), tuple(eligible_y))
+    sprites = range(len(images))
+    per_row = len(eligible_y)
+    while True:
+        chosen_x, chosen_y, row = (), (), ()
+        for _ in range(per_row):
+            x = rng.choice(x_table[chosen_x])
+            y = rng.choice(y_table[chosen_y])
+            chosen_x, chosen_y = chosen_x + (x,), chosen_y + (y,)
+            row += (x, y, rng.choice(sprites))
+        yield row
+
+
+class FrameSnapshot(NamedTuple):
+    """
+    Everything needed to draw a single frame of a race: where Mario, the background and the obstacles are.
+    """
+    score: int
+    mario_x: float
+    mario_y: float
+    background_x: float
+    background_y: float
+    obstacles: Tuple[Tuple[float, float, str], ...]
+    crash: bool
+
+
+class RaceSimulation:
+    """
+    A single race that is advanced one fixed tick at a time, without a display, a frame cap or any blitting.
+
+    The actions passed to step are (accelerating, decelerating, hor_accelerating, hor_decelerating). A headless race
+    never draws: it only uses the sizes of its sprites, and their collision masks, for which each sprite is decoded
+    once per process. Every random choice of a race is made by its own generator, so two races with the same seed
+    given the same actions are identical.
+    """
+    eligible_x: List[int]
+    eligible_y: List[int]
+    mario: Mario
+    background: Background
+    obstacles: List[Obstacle]
+    lanes: LaneIndex
+    pool: ObstaclePool
+    rows: Iterator[Tuple[int, ...]]
+    headless: bool
+    seed: int
+    rng: Random
+    spawns: List[Tuple[int, int, int, int]]
+    obstacle_generate_threshold: int
+    crash: bool
+    score: int
+    idle_time: int
+
+    # the distance that has to be travelled before a new row of obstacles is generated
+    obstacle_spacing = 860
+    # the number of ticks Mario may stay (vertically) idle before the race ends
+    max_idle_time = 100
+    # Mario crashes into the sides of the road when he is outside of these bounds
+    left_bound = 106.1421875
+    right_bound = 402.54199218749966
+    # obstacles that are further down than this have been passed
+    screen_height = 750
+    # more obstacles than this are hardly ever on the road at once
+    pool_capacity = 12
+    background_path = "lane3.jpeg"
+
+    def __init__(self, headless: bool=True, seed: Union[int, None]=None) -> None:
+        """
+        Initializes a new race on the road generated from <seed>, or from a seed drawn from the random module if no
+        seed is given.
+        """
+        self.headless = headless
+        self.seed = seed if seed is not None else getrandbits(64)
+        self.rng = Random(self.seed)
+
+        # the (tick, x, y, sprite) of every obstacle that was generated
+        self.spawns = []
+        self.score = 0
+
+        # The eligible x and y coordinates
+        self.eligible_x = [120, 240, 355]
+        self.eligible_y = [30 - 750, 300 - 750, 620 - 720]
+
+        # the obstacles in the order they were generated, and indexed by their lanes
+        self.obstacles = []
+        self.lanes = LaneIndex(self.eligible_x)
+        self.pool = ObstaclePool(self.pool_capacity, headless)
+        self.rows = obstacle_rows(self.rng, self.eligible_x, self.eligible_y)
+        self.generate_obstacles()
+
+        self.background = Background(self.background_path, 0, -1000, headless)
+        self.mario = Mario(266, 680, self.lanes, headless)
+
+        self.obstacle_generate_threshold = self.obstacle_spacing
+        self.crash = False
+        self.idle_time = 0
+
+    def generate_obstacles(self) -> None:
+        """
+        Generate a new row of obstacles at the top of the road.
+        """
+        row = next(self.rows)
+        for index in range(0, len(row), 3):
+            x, y, sprite = row[index:index + 3]
+            obstacle = self.pool.acquire(x, y, images[sprite])
+            self.obstacles.append(obstacle)
+            self.lanes.add(obstacle)
+            self.spawns.append((self.score, x, y, sprite))
+
+    def step(self, actions: Sequence[bool]) -> bool:
+        """
+        Advance the race by a single tick with the commands <actions>. Return whether or not Mario is still racing.
+        """
+        if self.crash:
+            return False
+
+        accelerating, decelerating, hor_accelerating, hor_decelerating = actions
+        mario, background = self.mario, self.background
+        self.score += 1
+
+        # Mario should not be idle (vertically) for too long (increase idle time for every iteration he is vertically
+        # idle)
+        if mario.speed == 0:
+            self.idle_time += 1
+
+        # reset Mario's idle time to 0 once he is moved (vertically)
+        if mario.speed != 0 and self.idle_time > 0:
+            self.idle_time = 0
+
+        # Mario cannot crash to the sides
+        if mario.x_cor <= self.left_bound or mario.x_cor >= self.right_bound:
+            self.crash = True
+
+        # if Mario has been idle for too long, ends game through crash
+        if self.idle_time >= self.max_idle_time:
+            self.crash = True
+
+        if self.crash:
+            return False
+
+        # blit back to beginning to make the game go on forever
+        if -410 <= background.y_cor <= -375:
+            background.move_background(background.x_cor, -1000)
+
+        if accelerating:
+            accelerating_true(mario, background)
+
+        if decelerating:
+            decelerating_true(mario, background)
+
+        # Mario is not accelerating nor decelerating but is still moving due to speed != 0
+        elif not accelerating and mario.speed != 0:
+            no_vert_command(mario, background)
+
+        if hor_accelerating:
+            hor_accelerating_true(mario)
+
+        if hor_decelerating:
+            hor_decelerating_true(mario)
+
+        # Mario is not accelerating nor decelerating but is still moving horizontally due to hor_speed != 0
+        elif not hor_accelerating and mario.hor_speed != 0:
+            no_hor_command(mario, background)
+
+        # Move the obstacles, and remove the ones that have been passed
+        for obstacle in self.obstacles:
+            obstacle.speed = background.speed
+            obstacle.move()
+        for obstacle in self.lanes.remove_passed(self.screen_height):
+            self.obstacles.remove(obstacle)
+            self.pool.release(obstacle)
+
+        # Generate more obstacles as Mario travels through the map
+        if background.travelled >= self.obstacle_generate_threshold:
+            self.obstacle_generate_threshold += self.obstacle_spacing
+            self.generate_obstacles()
+
+        # only the obstacles in the lanes and rows around Mario can touch him
+        for obstacle in self.lanes.near(mario.x_cor, mario.x_cor + mario.size[0], mario.y_cor,
+                                        mario.y_cor + mario.size[1]):
+            if collision_between(mario, obstacle):
+                self.crash = True
+
+        return not self.crash
+
+    def snapshot(self) -> FrameSnapshot:
+        """
+        Return a snapshot of the current frame of this race.
+        """
+        return FrameSnapshot(self.score, self.mario.x_cor, self.mario.y_cor, self.background.x_cor,
+                             self.background.y_cor,
+                             tuple((obstacle.x, obstacle.y, obstacle.image_path) for obstacle in self.obstacles),
+                             self.crash)
@@ -0,0 +1,130 @@
+"""
+Spectator mode that watches headless races without slowing them down
+"""
+from collections import deque
+from threading import Lock, Thread
+from typing import Deque, Union
+import pygame
+from Player import Player
+from renderer import Renderer
+from simulation import FrameSnapshot, RaceSimulation
+
+
+class SnapshotBuffer:
+    """
+    A bounded ring buffer of the frame snapshots published by a race. Publishing never waits for the spectator: once
+    the buffer is full the oldest snapshot is dropped, and a spectator that falls behind skips to the newest one.
+    """
+    snapshots: Deque[FrameSnapshot]
+    published: int
+    dropped: int
+    finished: bool
+
+    def __init__(self, capacity: int=256) -> None:
+        """
+        Initializes an empty buffer that holds at most <capacity> snapshots.
+        """
+        self.snapshots = deque(maxlen=capacity)
+        self.lock = Lock()
+        self.published, self.dropped = 0, 0
+        self.finished = False
+
+    def publish(self, snapshot: FrameSnapshot) -> None:
+        """
+        Add <snapshot> to the buffer.
+        """
+        with self.lock:
+            if len(self.snapshots) == self.snapshots.maxlen:
+                self.dropped += 1
+            self.snapshots.append(snapshot)
+            self.published += 1
+
+    def latest(self) -> Union[FrameSnapshot, None]:
+        """
+        Return the newest snapshot and drop the older ones, or return None if nothing was published since the last
+        call.
+        """
+        with self.lock:
+            if len(self.snapshots) == 0:
+                return None
+            snapshot = self.snapshots.pop()
+            self.dropped += len(self.snapshots)
+            self.snapshots.clear()
+            return snapshot
+
+    def finish(self) -> None:
+        """
+        Mark that nothing else will be published.
+        """
+        self.finished = True
+
+
+def race_and_publish(player: Player, buffer: SnapshotBuffer) -> None:
+    """
+    Let <player> race again on the road of its last race, in a headless race at full speed, publishing a snapshot of
+    every tick into <buffer>. Raise a ValueError if no seed reproduces the last race of <player>.
+    """
+    if player.race_seed is None:
+        raise ValueError("The player has no race seed to race again with")
+
+    race = RaceSimulation(seed=player.race_seed)
+    buffer.publish(race.snapshot())
+    while not player.dead:
+        player.look(race)
+        player.update(race, player.think())
+        buffer.publish(race.snapshot())
+    buffer.finish()
+
+
+class Spectator:
+    """
+    A window that draws the snapshots published into a buffer at display rate, independently of how fast the race
+    producing them runs.
+    """
+    buffer: SnapshotBuffer
+    fps: int
+
+    def __init__(self, buffer: SnapshotBuffer, fps: int=150) -> None:
+        """
+        Initializes a spectator of <buffer>.
+        """
+        self.buffer, self.fps = buffer, fps
+
+    def run(self) -> None:
+        """
+        Open the window and draw the published frames until it is closed. This has to run in the main thread.
+        """
+        pygame.init()
+        display = pygame.display.set_mode((550, 750))
+        pygame.display.set_caption("2D Mario Kart! (spectating)")
+        renderer = Renderer(display)
+        clock = pygame.time.Clock()
+
+        running = True
+        game_over = False
+        while running:
+            for event in pygame.event.get():
+                if event.type == pygame.QUIT:
+                    running = False
+
+            snapshot = self.buffer.latest()
+            if snapshot is not None and not game_over:
+                renderer.draw(snapshot)
+                if snapshot.crash:
+                    renderer.draw_banner("Game Over!")
+                    game_over = True
+
+            clock.tick(self.fps)
+
+
+def spectate(player: Player, fps: int=150) -> None:
+    """
+    Watch a replay clone of <player>, such as a species' champion, race in a background thread. Raise a ValueError if
+    no seed reproduces the last race of <player>, such as after a VectorizedEvaluator evaluated it.
+    """
+    if player.race_seed is None:
+        raise ValueError("The player has no race seed to race again with")
+
+    buffer = SnapshotBuffer()
+    Thread(target=race_and_publish, args=(player.clone_for_replay(), buffer), daemon=True).start()
+    Spectator(buffer, fps).run()
@@ -0,0 +1,96 @@
+"""
+Checks that BatchRaceSimulation and BatchObservationBuilder follow the rules of RaceSimulation and ObservationBuilder
+
+The two simulations draw their roads from different generators, so the obstacles of each RaceSimulation are copied
+into a single kart BatchRaceSimulation before every tick, and both are stepped with the same seeded actions.
+"""
+from random import Random
+import unittest
+import numpy as np
+from batch_simulation import BatchRaceSimulation
+from observation import BatchObservationBuilder, ObservationBuilder, inputs
+from obstacle import images
+from simulation import RaceSimulation
+
+races = 30
+max_ticks = 3000
+
+
+def copy_obstacles(race: RaceSimulation, batch: BatchRaceSimulation) -> None:
+    """
+    Replace the obstacles of the only kart of <batch> with the obstacles of <race>.
+    """
+    batch.obstacle_alive[0] = False
+    for slot, obstacle in enumerate(race.obstacles):
+        batch.obstacle_x[0, slot], batch.obstacle_y[0, slot] = obstacle.x, obstacle.y
+        batch.obstacle_width[0, slot], batch.obstacle_height[0, slot] = obstacle.size
+        batch.obstacle_sprite[0, slot] = images.index(obstacle.image_path)
+        batch.obstacle_lane[0, slot] = race.lanes.lane_numbers[obstacle.x]
+        batch.obstacle_alive[0, slot] = True
+
+
+def random_actions(rng: Random) -> tuple:
+    """
+    Return seeded commands that mostly accelerate, and sometimes brake, reverse or steer.
+    """
+    return rng.random() < 0.8, rng.random() < 0.15, rng.random() < 0.3, rng.random() < 0.3
+
+
+class BatchParityTest(unittest.TestCase):
+    """
+    Races the same seeded actions on the same obstacles in both simulations.
+    """
+
+    def race_pairs(self):
+        """
+        Yield every tick of every race as the RaceSimulation, the BatchRaceSimulation and the tick, after the
+        obstacles are copied and before the tick is stepped.
+        """
+        for seed in range(races):
+            rng = Random(seed)
+            race = RaceSimulation(seed=seed)
+            batch = BatchRaceSimulation(1, seed)
+            # the batch only ever has the obstacles of the race
+            batch.obstacle_generate_threshold[:] = np.inf
+
+            for tick in range(max_ticks):
+                copy_obstacles(race, batch)
+                yield race, batch, tick
+
+                actions = random_actions(rng)
+                racing = race.step(actions)
+                self.assertEqual(racing, bool(batch.step(np.array([actions]))[0]))
+                if not racing:
+                    break
+
+    def test_karts_match(self) -> None:
+        """
+        Mario moves, travels and crashes the same way in both simulations.
+        """
+        for race, batch, tick in self.race_pairs():
+            mario = race.mario
+            expected = (mario.x_cor, mario.speed, mario.acceleration, mario.hor_speed, mario.hor_acceleration,
+                        race.background.y_cor, race.background.travelled, race.idle_time, race.crash)
+            actual = (batch.x_cor[0], batch.speed[0], batch.acceleration[0], batch.hor_speed[0],
+                      batch.hor_acceleration[0], batch.background_y[0], batch.travelled[0], batch.idle_time[0],
+                      batch.crash[0])
+            self.assertEqual(expected, tuple(value.item() for value in actual),
+                             "race {} at tick {}".format(race.seed, tick))
+
+    def test_observations_match(self) -> None:
+        """
+        Mario sees the same road in both simulations.
+        """
+        observer = ObservationBuilder()
+        vision, batch_vision = np.empty(inputs), np.empty((1, inputs))
+        for race, batch, tick in self.race_pairs():
+            if tick == 0:
+                batch_observer = BatchObservationBuilder(batch)
+            observer.observe(race, vision)
+            batch_observer.observe(batch, batch_vision)
+            np.testing.assert_allclose(batch_vision[0], vision, rtol=0, atol=1e-12,
+                                       err_msg="race {} at tick {}".format(race.seed, tick))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+"""
+Checks that the compiled neural networks of FeedForwardPlan and PopulationPlan give the same outputs as engaging the
+nodes of a Genome one at a time
+"""
+import random
+import unittest
+import numpy as np
+from ConnectionHistory import InnovationHistory
+from Genome import Genome
+from PopulationPlan import PopulationPlan
+
+inputs, outputs = 6, 4
+genome_count = 40
+observation_count = 25
+
+
+def grown_genome(history: InnovationHistory, gene_count: int) -> Genome:
+    """
+    Return a new genome grown with random connection and node additions until it has at least <gene_count> genes, so
+    that most of its hidden nodes are chained behind other hidden nodes.
+    """
+    genome = Genome(inputs, outputs)
+    while len(genome.genes) < gene_count:
+        if genome.fully_connected() or random.random() < 0.4:
+            genome.mutate_by_node_addition(history)
+        else:
+            genome.add_connection(history)
+
+    # some genomes disable genes, and some have weights large enough to saturate their nodes
+    for gene in genome.genes:
+        if random.random() < 0.1:
+            gene.enabled = False
+        gene.weight *= random.choice((1, 1, 50))
+    genome.plan = None
+    genome.generate_neural_network()
+    return genome
+
+
+class PlanParityTest(unittest.TestCase):
+    """
+    Evaluates seeded genomes with chained hidden nodes on seeded observations in every way.
+    """
+
+    def setUp(self) -> None:
+        """
+        Grow the seeded genomes and draw the seeded observations.
+        """
+        random.seed(0)
+        history = InnovationHistory(inputs * outputs + inputs)
+        self.genomes = [grown_genome(history, random.randint(1, 60)) for _ in range(genome_count)]
+        self.observations = np.random.default_rng(0).uniform(-1, 1, (observation_count, inputs))
+
+    def test_hidden_nodes_are_chained(self) -> None:
+        """
+        The genomes have more than one layer of hidden nodes, so the plans have to evaluate their layers in order.
+        """
+        self.assertTrue(any(max(node.layer for node in genome.nodes) > 3 for genome in self.genomes))
+
+    def test_evaluate_one_matches_feed_forward(self) -> None:
+        """
+        A FeedForwardPlan gives the outputs of the genome for a single set of inputs.
+        """
+        for index, genome in enumerate(self.genomes):
+            for observation in self.observations:
+                expected = genome.feed_forward(list(observation))
+                np.testing.assert_allclose(genome.compile().evaluate_one(list(observation)), expected, rtol=1e-9,
+                                           err_msg="genome {}".format(index))
+
+    def test_evaluate_matches_feed_forward(self) -> None:
+        """
+        A FeedForwardPlan gives the outputs of the genome for every row of a batch of inputs.
+        """
+        for index, genome in enumerate(self.genomes):
+            expected = [genome.feed_forward(list(observation)) for observation in self.observations]
+            np.testing.assert_allclose(genome.compile().evaluate(self.observations), expected, rtol=1e-9,
+                                       err_msg="genome {}".format(index))
+
+    def test_population_plan_matches_feed_forward(self) -> None:
+        """
+        A PopulationPlan gives the outputs of each genome for its own row of inputs.
+        """
+        rows = self.observations[np.arange(genome_count) % observation_count]
+        expected = [genome.feed_forward(list(row)) for genome, row in zip(self.genomes, rows)]
+        np.testing.assert_allclose(PopulationPlan(self.genomes).evaluate(rows), expected, rtol=1e-9)
+
+    def test_saturated_nodes_are_not_nan(self) -> None:
+        """
+        A node that saturates to infinity does not turn the nodes that it is not connected to into NaN.
+        """
+        outputs_found = [genome.compile().evaluate(self.observations) for genome in self.genomes]
+        self.assertTrue(any(np.isinf(found).any() for found in outputs_found))
+        for index, (genome, found) in enumerate(zip(self.genomes, outputs_found)):
+            expected = np.array([genome.feed_forward(list(observation)) for observation in self.observations])
+            np.testing.assert_array_equal(np.isnan(found), np.isnan(expected), err_msg="genome {}".format(index))
+
+
+if __name__ == "__main__":
+    unittest.main()